@@ -0,0 +1 @@
+python3 src/benchmarks.py "$@"
\ No newline at end of file
@@ -1,2 +1,10 @@
-python3 src/main.py
-cd public && python3 -m http.server 8888
\ No newline at end of file
+case " $* " in
+*" --watch "*)
+    python3 src/main.py "$@" &
+    trap "kill $!" EXIT
+    ;;
+*)
+    python3 src/main.py "$@"
+    ;;
+esac
+python3 -m http.server 8888 --directory public
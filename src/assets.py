@@ -0,0 +1,179 @@
+"""Module providing static file copying: bulk parallel copies and incremental sync"""
+
+import os
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from manifest import file_hash
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+LINK_MODES = ("copy", "hardlink", "reflink")
+COPY_THREADS = 8
+FICLONE = getattr(fcntl, "FICLONE", 0x40049409)
+
+
+def files_differ(source: os.DirEntry, dest: os.DirEntry, use_hash=False):
+    """Compare two files by size, then by content hash or modification time"""
+    source_stat = source.stat()
+    dest_stat = dest.stat()
+    if source_stat.st_size != dest_stat.st_size:
+        return True
+    if use_hash:
+        return file_hash(source.path) != file_hash(dest.path)
+    return source_stat.st_mtime_ns != dest_stat.st_mtime_ns
+
+
+def reflink(source: str, destination: str):
+    """Clone source to destination sharing blocks (copy-on-write), if supported"""
+    if fcntl is None:
+        raise OSError("reflinks are not supported on this platform")
+    with open(source, "rb") as source_file, open(destination, "wb") as dest_file:
+        fcntl.ioctl(dest_file.fileno(), FICLONE, source_file.fileno())
+    shutil.copystat(source, destination)
+
+
+def place_file(source: str, destination: str, link="copy"):
+    """Copy, hardlink or reflink source to destination, falling back to a copy"""
+    if link not in LINK_MODES:
+        raise ValueError(f"link should be one of {', '.join(LINK_MODES)}")
+    if link == "copy":
+        shutil.copy2(source, destination)
+        return
+    tmp_path = f"{destination}.tmp"
+    try:
+        if link == "hardlink":
+            os.link(source, tmp_path)
+        else:
+            reflink(source, tmp_path)
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        shutil.copy2(source, tmp_path)
+    os.replace(tmp_path, destination)
+
+
+def scan_files(source: str, destination: str):
+    """List (source, destination, size) for every file under source, via os.scandir"""
+    files = []
+    pending = [(source, destination)]
+    while pending:
+        source_dir, dest_dir = pending.pop()
+        with os.scandir(source_dir) as entries:
+            for entry in entries:
+                dest_path = os.path.join(dest_dir, entry.name)
+                if entry.is_dir():
+                    pending.append((entry.path, dest_path))
+                elif entry.is_file():
+                    files.append((entry.path, dest_path, entry.stat().st_size))
+    return files
+
+
+def copy_files(files: list, threads=COPY_THREADS, link="copy", logging=False):
+    """Copy (source, destination, size) files on a thread pool
+
+    Returns the number of files and bytes copied, and the seconds it took
+    """
+    start = time.perf_counter()
+    for parent_dir in {os.path.dirname(dest) for _, dest, _ in files}:
+        os.makedirs(parent_dir, exist_ok=True)
+
+    def copy_one(file):
+        source, dest, _ = file
+        if logging:
+            print(f"Copying: {source} to {dest}")
+        place_file(source, dest, link)
+
+    if threads > 1 and len(files) > 1:
+        with ThreadPoolExecutor(threads) as pool:
+            for _ in pool.map(copy_one, files):
+                pass
+    else:
+        for file in files:
+            copy_one(file)
+    return {
+        "files": len(files),
+        "bytes": sum(size for _, _, size in files),
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def throughput(stats: dict):
+    """Describe copy statistics as files/s and MB/s"""
+    seconds = max(stats["seconds"], 1e-9)
+    megabytes = stats["bytes"] / 1_000_000
+    return (
+        f"{stats['files']} files, {megabytes:.1f} MB in {stats['seconds']:.2f} s "
+        f"({stats['files'] / seconds:.0f} files/s, {megabytes / seconds:.1f} MB/s)"
+    )
+
+
+def remove_stale(path: str, keep=None, logging=False):
+    """Remove a file or tree that is no longer in the source, sparing kept files"""
+    removed = 0
+    if os.path.isdir(path) and not os.path.islink(path):
+        with os.scandir(path) as entries:
+            for entry in entries:
+                removed += remove_stale(entry.path, keep, logging)
+        if not os.listdir(path):
+            os.rmdir(path)
+    elif keep is None or not keep(path):
+        if logging:
+            print(f"Removing: {path}")
+        os.remove(path)
+        removed += 1
+    return removed
+
+
+def sync_assets(
+    source: str,
+    destination: str,
+    use_hash=False,
+    link="copy",
+    keep=None,
+    logging=False,
+    threads=COPY_THREADS,
+):
+    """Make destination mirror source, copying only new or changed files
+
+    Files are compared by size and mtime, or by content hash with use_hash.
+    Files in destination that are not in source are removed, unless
+    keep(path) is true; generated pages share the destination, so they
+    should be kept. Returns counts of copied, skipped and removed files
+    """
+    if not os.path.exists(source):
+        raise FileNotFoundError(f"Could not find folder: {source}")
+    stats = {"copied": 0, "skipped": 0, "removed": 0}
+    to_copy = []
+    pending = [(source, destination)]
+    while pending:
+        source_dir, dest_dir = pending.pop()
+        os.makedirs(dest_dir, exist_ok=True)
+        with os.scandir(dest_dir) as entries:
+            existing = {entry.name: entry for entry in entries}
+        with os.scandir(source_dir) as entries:
+            for entry in entries:
+                dest_entry = existing.pop(entry.name, None)
+                dest_path = os.path.join(dest_dir, entry.name)
+                if entry.is_dir():
+                    if dest_entry is not None and not dest_entry.is_dir():
+                        os.remove(dest_path)
+                    pending.append((entry.path, dest_path))
+                    continue
+                if dest_entry is not None and dest_entry.is_dir():
+                    stats["removed"] += remove_stale(dest_path, keep, logging)
+                    dest_entry = None
+                if dest_entry is not None and not files_differ(
+                    entry, dest_entry, use_hash
+                ):
+                    stats["skipped"] += 1
+                    continue
+                to_copy.append((entry.path, dest_path, entry.stat().st_size))
+        for dest_entry in existing.values():
+            stats["removed"] += remove_stale(dest_entry.path, keep, logging)
+    stats["copied"] = copy_files(to_copy, threads, link, logging)["files"]
+    return stats
@@ -0,0 +1,646 @@
+"""Benchmarks for the markdown pipeline, run with: python3 src/benchmarks.py
+
+The pipeline suite times the parser on synthetic corpora and can save its
+results as a baseline, or compare against one to catch regressions
+"""
+
+import argparse
+import gc
+import json
+import os
+import random
+import re
+import shutil
+import tempfile
+import time
+import timeit
+import tracemalloc
+
+from assets import copy_files, scan_files, throughput
+from contentindex import ContentIndex
+from document import Document
+from htmlnode import LeafNode, ParentNode
+from main import find_pages, generate_pages_recursive
+from pipeline import build_pages_pipelined, read_text
+from template import load_template
+from textnode import (
+    BlockType,
+    TextNode,
+    TextType,
+    block_to_block_type,
+    markdown_to_blocks,
+    markdown_to_html_node,
+    scan_blocks,
+    split_nodes_delimiters,
+    split_nodes_image,
+    split_nodes_link,
+    swap_types,
+    text_to_textnodes,
+)
+
+
+def legacy_split_nodes_delimiter(
+    old_nodes: list[TextNode], delimiter: str, text_type: TextType
+):
+    """The original split_nodes_delimiter: count, split, swap_types and filter"""
+    new_nodes = []
+    for node in old_nodes:
+        if node.text_type != TextType.NORMAL:
+            new_nodes.append(node)
+        else:
+            if node.text.count(delimiter) % 2 == 1:
+                raise ValueError("Missing delimiter")
+            new_type = TextType.NORMAL
+            for text in node.text.split(delimiter):
+                new_nodes.append(TextNode(text, new_type, node.url))
+                new_type = swap_types(new_type, TextType.NORMAL, text_type)
+    return [n for n in new_nodes if n.text != ""]
+
+
+def chained_delimiters(old_nodes: list[TextNode]):
+    """The original bold, italic and code passes"""
+    new_nodes = legacy_split_nodes_delimiter(old_nodes, "**", TextType.BOLD)
+    new_nodes = legacy_split_nodes_delimiter(new_nodes, "*", TextType.ITALIC)
+    return legacy_split_nodes_delimiter(new_nodes, "`", TextType.CODE)
+
+
+def chained_text_to_textnodes(text: str):
+    """The original text_to_textnodes: five chained passes over the node list"""
+    return chained_delimiters(legacy_split_images_and_links(text))
+
+
+class DictTextNode:
+    """TextNode as it was before __slots__, for comparison"""
+
+    def __init__(self, text, text_type, url=None):
+        self.text = text
+        self.text_type = text_type
+        self.url = url
+
+
+class DictHTMLNode:
+    """HTMLNode as it was before __slots__, for comparison"""
+
+    def __init__(self, tag=None, value=None, children=None, props=None):
+        self.tag = tag
+        self.value = value
+        self.children = children
+        self.props = props
+
+
+def legacy_block_to_block_type(block: str):
+    """The original block_to_block_type: three splitlines passes"""
+    for n in range(6):
+        if block.startswith(f"{'#'*(n+1)} "):
+            return BlockType.HEADING
+    if block.startswith("```") and block.endswith("```"):
+        return BlockType.CODE
+    is_quote_block = True
+    for line in block.splitlines():
+        if not line.startswith(">"):
+            is_quote_block = False
+    if is_quote_block:
+        return BlockType.QUOTE
+    is_unordered_list = True
+    for line in block.splitlines():
+        if not line.startswith("* ") and not line.startswith("- "):
+            is_unordered_list = False
+    if is_unordered_list:
+        return BlockType.UNORDERED_LIST
+    is_ordered_list = True
+    line_number = 0
+    for line in block.splitlines():
+        line_number += 1
+        if not line.startswith(f"{line_number}. "):
+            is_ordered_list = False
+    if is_ordered_list:
+        return BlockType.ORDERED_LIST
+    return BlockType.PARAGRAPH
+
+
+def legacy_classified_blocks(markdown: str):
+    """markdown_to_blocks followed by the original classifier, as separate passes"""
+    return [
+        (legacy_block_to_block_type(block), block)
+        for block in markdown_to_blocks(markdown)
+    ]
+
+
+def legacy_split_nodes_general(
+    old_nodes: list[TextNode], text_type: TextType, format_string: str, pattern
+):
+    """The original split_nodes_general: re.findall, then str.split per match"""
+    new_nodes = []
+    for n in old_nodes:
+        node_text = n.text
+        for l in re.findall(pattern, n.text):
+            split = node_text.split(format_string.format(l[0], l[1]))
+            new_nodes.append(TextNode(split[0], n.text_type))
+            new_nodes.append(TextNode(l[0], text_type, l[1]))
+            node_text = split[1]
+        new_nodes.append(TextNode(node_text, n.text_type, n.url))
+    return [n for n in new_nodes if n.text != ""]
+
+
+def legacy_split_images_and_links(text: str):
+    """split_nodes_image then split_nodes_link, as originally written"""
+    nodes = legacy_split_nodes_general(
+        [TextNode(text, TextType.NORMAL)],
+        TextType.IMAGE,
+        "![{}]({})",
+        r"!\[([^\]]+)\]\(([^\)]+)\)",
+    )
+    return legacy_split_nodes_general(
+        nodes, TextType.LINK, "[{}]({})", r"\[([^\]]+)\]\(([^\)]+)\)"
+    )
+
+
+def split_images_and_links(text: str):
+    """split_nodes_image then split_nodes_link"""
+    return split_nodes_link(split_nodes_image([TextNode(text, TextType.NORMAL)]))
+
+
+def bench_delimiters(sizes=(100, 1000, 10_000)):
+    """Compare the three chained delimiter passes to the one-scan engine"""
+    print("splitting bold, italic and code out of emphasis-heavy prose")
+    for words in sizes:
+        nodes = [TextNode(prose(random.Random(words), words), TextType.NORMAL)]
+        if split_nodes_delimiters(nodes) != chained_delimiters(nodes):
+            raise AssertionError("one-scan and chained output differ")
+        chained = best_time(chained_delimiters, nodes)
+        single = best_time(split_nodes_delimiters, nodes)
+        print(
+            f"  {words:>6} words: chained {chained * 1000:8.3f} ms, "
+            f"one scan {single * 1000:8.3f} ms, {chained / single:5.1f}x"
+        )
+
+
+def bench_link_split(sizes=(10, 100, 500)):
+    """Compare findall and str.split to finditer spans on link-heavy paragraphs"""
+    print("splitting images and links out of paragraphs")
+    for links in sizes:
+        text = link_heavy_paragraph(links)
+        assert legacy_split_images_and_links(text) == split_images_and_links(text)
+        number = max(1, 2000 // links)
+        legacy = min(
+            timeit.repeat(
+                lambda: legacy_split_images_and_links(text), number=number, repeat=5
+            )
+        )
+        current = min(
+            timeit.repeat(lambda: split_images_and_links(text), number=number, repeat=5)
+        )
+        print(
+            f"  {links:>4} links: findall + split {legacy / number * 1e6:9.1f} us, "
+            f"finditer {current / number * 1e6:9.1f} us, {legacy / current:5.1f}x"
+        )
+
+
+def link_heavy_paragraph(links: int):
+    """A paragraph with the given number of distinct links, plus some emphasis"""
+    return " ".join(
+        f"Item {n} has **bold** and *italic* text, `code` and [link {n}](/page/{n})"
+        for n in range(links)
+    )
+
+
+def best_time(function, *args, repeat=5):
+    """Best wall time of a single call, in seconds"""
+    number = 1
+    while timeit.timeit(lambda: function(*args), number=number) < 0.2:
+        number *= 2
+    times = timeit.repeat(lambda: function(*args), number=number, repeat=repeat)
+    return min(times) / number
+
+
+def bench_text_to_textnodes(sizes=(10, 100, 1000)):
+    """Compare the single-pass inline scanner to the chained split passes"""
+    print("text_to_textnodes on link-heavy paragraphs")
+    for links in sizes:
+        text = link_heavy_paragraph(links)
+        if text_to_textnodes(text) != chained_text_to_textnodes(text):
+            raise AssertionError("single-pass and chained output differ")
+        chained = best_time(chained_text_to_textnodes, text)
+        single = best_time(text_to_textnodes, text)
+        print(
+            f"  {links:>5} links: chained {chained * 1000:9.3f} ms, "
+            f"single-pass {single * 1000:9.3f} ms, {chained / single:6.1f}x"
+        )
+
+
+def allocated_bytes(build):
+    """Bytes still allocated after calling build(), which must return its objects"""
+    gc.collect()
+    tracemalloc.start()
+    objects = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del objects
+    return size
+
+
+def bench_node_memory(count=100_000):
+    """Compare memory of __slots__ node classes to the old __dict__ classes"""
+    print(f"memory for {count} nodes")
+    texts = [f"text {n}" for n in range(count)]
+    cases = [
+        (
+            "TextNode",
+            lambda: [DictTextNode(t, TextType.NORMAL) for t in texts],
+            lambda: [TextNode(t, TextType.NORMAL) for t in texts],
+        ),
+        (
+            "LeafNode",
+            lambda: [DictHTMLNode("b", t) for t in texts],
+            lambda: [LeafNode("b", t) for t in texts],
+        ),
+        (
+            "ParentNode",
+            lambda: [DictHTMLNode("p", children=texts) for _ in texts],
+            lambda: [ParentNode("p", texts) for _ in texts],
+        ),
+    ]
+    for name, build_dict, build_slots in cases:
+        with_dict = allocated_bytes(build_dict)
+        with_slots = allocated_bytes(build_slots)
+        print(
+            f"  {name:<10}: __dict__ {with_dict / count:6.1f} B/node, "
+            f"__slots__ {with_slots / count:6.1f} B/node, "
+            f"{1 - with_slots / with_dict:6.1%} smaller"
+        )
+
+
+def make_static_tree(root: str, files: int, size=2048, per_dir=500):
+    """Write a synthetic static tree of small files"""
+    data = os.urandom(size)
+    for n in range(files):
+        directory = os.path.join(root, f"dir{n // per_dir:04}")
+        if n % per_dir == 0:
+            os.makedirs(directory)
+        with open(os.path.join(directory, f"asset{n}.bin"), "wb") as file:
+            file.write(data)
+
+
+def listdir_copy(source: str, destination: str):
+    """The original serial copy: os.listdir, os.path.isfile and shutil.copy"""
+    os.mkdir(destination)
+    for name in os.listdir(source):
+        new_source = os.path.join(source, name)
+        new_destination = os.path.join(destination, name)
+        if os.path.isfile(new_source):
+            shutil.copy(new_source, new_destination)
+        elif os.path.isdir(new_source):
+            listdir_copy(new_source, new_destination)
+
+
+def bench_copy(files=100_000, threads=(1, 4, 16)):
+    """Compare serial listdir copying to scandir plus a thread pool"""
+    print(f"copying a synthetic static tree of {files} files")
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "static")
+        make_static_tree(source, files)
+        start = timeit.default_timer()
+        listdir_copy(source, os.path.join(tmp, "serial"))
+        elapsed = timeit.default_timer() - start
+        print(f"  listdir + shutil.copy: {files / elapsed:8.0f} files/s")
+        shutil.rmtree(os.path.join(tmp, "serial"))
+        for count in threads:
+            destination = os.path.join(tmp, f"threads{count}")
+            stats = copy_files(scan_files(source, destination), count)
+            print(f"  scandir, {count:>2} threads: {throughput(stats)}")
+            shutil.rmtree(destination)
+
+
+def listdir_find_pages(dir_path_content: str, dest_dir_path: str):
+    """The original discovery: sorted os.listdir and os.path.isdir per entry"""
+    pages = []
+    for file in sorted(os.listdir(dir_path_content)):
+        source_file_path = os.path.join(dir_path_content, file)
+        filename, ext = os.path.splitext(file)
+        if ext.lower() == ".md":
+            pages.append(
+                (source_file_path, os.path.join(dest_dir_path, f"{filename}.html"))
+            )
+        elif os.path.isdir(source_file_path):
+            pages.extend(
+                listdir_find_pages(
+                    source_file_path, os.path.join(dest_dir_path, filename)
+                )
+            )
+    return pages
+
+
+def bench_discovery(files=100_000):
+    """Compare listdir discovery to a cold and a warm persisted ContentIndex"""
+    print(f"discovering pages in a synthetic tree of {files} files")
+    with tempfile.TemporaryDirectory() as tmp:
+        content = os.path.join(tmp, "content")
+        make_static_tree(content, files, size=16)
+        past = time.time() - 3600
+        for dir_path, _, _ in os.walk(content):
+            os.utime(dir_path, (past, past))
+        index_path = os.path.join(tmp, "index.json")
+        start = timeit.default_timer()
+        listdir_find_pages(content, "public")
+        print(f"  listdir + isdir:  {timeit.default_timer() - start:8.3f} s")
+        start = timeit.default_timer()
+        index = ContentIndex(index_path)
+        find_pages(content, "public", index)
+        index.save()
+        print(f"  index, cold:      {timeit.default_timer() - start:8.3f} s")
+        start = timeit.default_timer()
+        index = ContentIndex(index_path)
+        find_pages(content, "public", index)
+        print(
+            f"  index, warm:      {timeit.default_timer() - start:8.3f} s "
+            f"({index.reused} directories reused, {index.rescanned} rescanned)"
+        )
+
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "benchmark_baseline.json")
+REGRESSION_THRESHOLD = 1.5
+
+TEMPLATE = "<html><title>{{ Title }}</title><body>{{ Content }}</body></html>"
+
+
+def prose(rng: random.Random, words: int):
+    """Random words with occasional bold, italic and code spans"""
+    vocabulary = ["elves", "ring", "shire", "mountain", "river", "road", "tower"]
+    out = []
+    for n in range(words):
+        word = rng.choice(vocabulary)
+        if n % 17 == 0:
+            word = f"**{word}**"
+        elif n % 11 == 0:
+            word = f"*{word}*"
+        elif n % 13 == 0:
+            word = f"`{word}`"
+        out.append(word)
+    return " ".join(out)
+
+
+def corpus_deep_lists(rng: random.Random, blocks: int):
+    """Long ordered and unordered lists"""
+    parts = ["# Lists"]
+    for n in range(blocks):
+        if n % 2:
+            parts.append("\n".join(f"* {prose(rng, 8)}" for _ in range(50)))
+        else:
+            parts.append("\n".join(f"{i + 1}. {prose(rng, 8)}" for i in range(50)))
+    return "\n\n".join(parts)
+
+
+def corpus_code(rng: random.Random, blocks: int):
+    """Huge code blocks between short paragraphs"""
+    parts = ["# Code"]
+    for n in range(blocks):
+        parts.append(prose(rng, 20))
+        lines = "\n".join(
+            f"    call_{n}_{i}(x, y)  # {rng.random()}" for i in range(500)
+        )
+        parts.append(f"```\n{lines}\n```")
+    return "\n\n".join(parts)
+
+
+def corpus_links(rng: random.Random, blocks: int):
+    """Link and image dense paragraphs"""
+    parts = ["# Links"]
+    for n in range(blocks):
+        parts.append(
+            " ".join(
+                f"see [{prose(rng, 2)}](/pages/{n}/{i}) "
+                f"and ![img {i}](/img/{n}/{i}.png)"
+                for i in range(100)
+            )
+        )
+    return "\n\n".join(parts)
+
+
+def corpus_mixed(rng: random.Random, blocks: int):
+    """Headings, paragraphs, quotes and short lists, like a typical page"""
+    parts = ["# Mixed"]
+    for n in range(blocks):
+        kind = n % 4
+        if kind == 0:
+            parts.append(f"## Section {n}")
+        elif kind == 1:
+            parts.append(prose(rng, 80))
+        elif kind == 2:
+            parts.append("\n".join(f"> {prose(rng, 10)}" for _ in range(3)))
+        else:
+            parts.append("\n".join(f"- {prose(rng, 6)}" for _ in range(5)))
+    return "\n\n".join(parts)
+
+
+CORPORA = {
+    "deep_lists": corpus_deep_lists,
+    "code": corpus_code,
+    "links": corpus_links,
+    "mixed": corpus_mixed,
+}
+
+
+def make_corpus(shape: str, blocks: int, seed=0):
+    """A reproducible synthetic markdown document of the given shape"""
+    return CORPORA[shape](random.Random(seed), blocks)
+
+
+def make_content_tree(root: str, files: int, shape="mixed", blocks=20, per_dir=100):
+    """Write a content tree of many small pages, and a template next to it"""
+    for n in range(files):
+        directory = os.path.join(root, "content", f"section{n // per_dir:03}")
+        if n % per_dir == 0:
+            os.makedirs(directory)
+        path = os.path.join(directory, f"page{n}.md")
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(make_corpus(shape, blocks, seed=n))
+    template_path = os.path.join(root, "template.html")
+    with open(template_path, "w", encoding="utf-8") as file:
+        file.write(TEMPLATE)
+    return os.path.join(root, "content"), template_path
+
+
+def bench_pipeline(blocks=200, files=1000):
+    """Time each pipeline stage on every corpus shape, and a full build"""
+    results = {}
+    for shape in CORPORA:
+        markdown = make_corpus(shape, blocks)
+        document_blocks = markdown_to_blocks(markdown)
+        paragraphs = [
+            block for block in document_blocks if not block.startswith(("```", "#"))
+        ]
+        results[f"{shape}/markdown_to_html_node"] = best_time(
+            markdown_to_html_node, markdown
+        )
+        results[f"{shape}/block_to_block_type"] = best_time(
+            lambda: [block_to_block_type(block) for block in document_blocks]
+        )
+        results[f"{shape}/text_to_textnodes"] = best_time(
+            lambda: [text_to_textnodes(paragraph) for paragraph in paragraphs]
+        )
+    with tempfile.TemporaryDirectory() as tmp:
+        content, template_path = make_content_tree(tmp, files)
+        builds = []
+        for run in range(3):
+            dest = os.path.join(tmp, f"public{run}")
+            start = timeit.default_timer()
+            generate_pages_recursive(content, template_path, dest, logging=False)
+            builds.append(timeit.default_timer() - start)
+        results[f"build/{files}_files"] = min(builds)
+    return results
+
+
+def print_results(results: dict, baseline: dict = None, threshold=REGRESSION_THRESHOLD):
+    """Print results, with the ratio to a baseline if given; returns regressions"""
+    regressions = []
+    for name, seconds in results.items():
+        line = f"  {name:<40}{seconds * 1000:12.3f} ms"
+        if baseline and name in baseline:
+            ratio = seconds / baseline[name]
+            line += f" {ratio:6.2f}x baseline"
+            if ratio > threshold:
+                line += "  REGRESSION"
+                regressions.append(name)
+        print(line)
+    return regressions
+
+
+def run_pipeline(
+    save_baseline=False, threshold=REGRESSION_THRESHOLD, baseline_path=BASELINE_PATH
+):
+    """Run the pipeline suite, save or compare with the baseline"""
+    print("pipeline on synthetic corpora")
+    results = bench_pipeline()
+    baseline = None
+    if os.path.exists(baseline_path) and not save_baseline:
+        with open(baseline_path, encoding="utf-8") as file:
+            baseline = json.load(file)
+    regressions = print_results(results, baseline, threshold)
+    if save_baseline:
+        with open(baseline_path, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2, sort_keys=True)
+        print(f"  baseline saved to {baseline_path}")
+    return regressions
+
+
+def bench_block_scan(blocks=(1000, 5000)):
+    """Compare the single-pass block scanner to split-then-classify"""
+    print("block splitting and classification")
+    for count in blocks:
+        for shape in ("mixed", "deep_lists"):
+            markdown = make_corpus(shape, count)
+            if list(scan_blocks(markdown)) != legacy_classified_blocks(markdown):
+                raise AssertionError("scan_blocks and split-then-classify differ")
+            legacy = best_time(legacy_classified_blocks, markdown, repeat=3)
+            single = best_time(lambda: list(scan_blocks(markdown)), repeat=3)
+            print(
+                f"  {shape:<10} {len(markdown) / 1e6:5.1f} MB: "
+                f"split+classify {legacy * 1000:8.1f} ms, "
+                f"scan_blocks {single * 1000:8.1f} ms, {legacy / single:5.2f}x"
+            )
+
+
+def write_text(path: str, text: str):
+    """Write an output page, creating its folder"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as file:
+        file.write(text)
+
+
+def render_page(document: Document, template_path: str, cache=None):
+    """Render a Document to a full page with the template"""
+    return load_template(template_path).render(document.template_values(cache))
+
+
+def with_latency(function, latency):
+    """Wrap an I/O function so every call first waits, like a network volume"""
+
+    def slow(*args):
+        time.sleep(latency)
+        return function(*args)
+
+    return slow
+
+
+def bench_async_io(files=200, latency=0.005):
+    """Compare a serial build to the asyncio pipeline on a high-latency volume"""
+    print(f"building {files} pages with {latency * 1000:.0f} ms I/O latency")
+    read_file = with_latency(read_text, latency)
+    write_file = with_latency(write_text, latency)
+    with tempfile.TemporaryDirectory() as tmp:
+        content, template_path = make_content_tree(tmp, files)
+        pages = find_pages(content, os.path.join(tmp, "serial"))
+        start = timeit.default_timer()
+        for source, dest in pages:
+            html = render_page(Document(read_file(source), source), template_path)
+            write_file(dest, html)
+        serial = timeit.default_timer() - start
+        start = timeit.default_timer()
+        build_pages_pipelined(
+            find_pages(content, os.path.join(tmp, "pipelined")),
+            template_path,
+            read_file=read_file,
+            write_file=write_file,
+            logging=False,
+        )
+        pipelined = timeit.default_timer() - start
+    print(
+        f"  serial {serial * 1000:8.0f} ms, pipelined {pipelined * 1000:8.0f} ms, "
+        f"{serial / pipelined:5.2f}x"
+    )
+
+
+BENCHMARKS = {
+    "inline": bench_text_to_textnodes,
+    "links": bench_link_split,
+    "delimiters": bench_delimiters,
+    "memory": bench_node_memory,
+    "blocks": bench_block_scan,
+    "pipeline": run_pipeline,
+    "async": bench_async_io,
+    "copy": bench_copy,
+    "discovery": bench_discovery,
+}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the site generator")
+    parser.add_argument(
+        "names",
+        nargs="*",
+        help=f"any of {', '.join(BENCHMARKS)}; inline, memory, blocks, pipeline "
+        "by default",
+    )
+    parser.add_argument(
+        "--files",
+        type=int,
+        default=100_000,
+        help="files for the copy and discovery benchmarks",
+    )
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help=f"store pipeline results as the new baseline in {BASELINE_PATH}",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=REGRESSION_THRESHOLD,
+        help="slowdown against the baseline reported as a regression",
+    )
+    args = parser.parse_args()
+    for name in args.names:
+        if name not in BENCHMARKS:
+            parser.error(f"unknown benchmark: {name}")
+    failed = []
+    for name in args.names or ["inline", "memory", "blocks", "pipeline"]:
+        if name == "copy":
+            bench_copy(args.files)
+        elif name == "discovery":
+            bench_discovery(args.files)
+        elif name == "pipeline":
+            failed = run_pipeline(args.save_baseline, args.threshold)
+        else:
+            BENCHMARKS[name]()
+    if failed:
+        raise SystemExit(f"{len(failed)} benchmark(s) regressed")
@@ -0,0 +1,99 @@
+"""Module providing BlockCache, memoized HTML for blocks repeated across pages"""
+
+import hashlib
+import json
+import os
+from collections import OrderedDict
+
+from output import save_json
+from textnode import RENDERER_VERSION
+
+
+def block_key(block: str):
+    """Hash of a block's text, used as its cache key"""
+    return hashlib.blake2b(block.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class BlockCache:
+    """Bounded LRU cache mapping block text hashes to rendered HTML
+
+    With a path the cache is loaded from and saved to disk, so repeated
+    blocks are rendered once ever rather than once per build
+    """
+
+    def __init__(self, max_entries=10_000, path: str = None):
+        self.max_entries = max_entries
+        self.path = path
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.added = None
+        if path is not None and os.path.exists(path):
+            with open(path, encoding="utf-8") as file:
+                data = json.load(file)
+            if data.get("version") == RENDERER_VERSION:
+                self.entries.update(data["entries"])
+                while len(self.entries) > self.max_entries:
+                    self.entries.popitem(last=False)
+
+    def __getstate__(self):
+        # copies sent to worker processes start counting from zero
+        state = self.__dict__.copy()
+        state.update(hits=0, misses=0, added={})
+        return state
+
+    def render(self, block: str, render_block):
+        """Return the HTML of block, calling render_block(block) only on a miss"""
+        key = block_key(block)
+        html = self.entries.get(key)
+        if html is not None:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return html
+        self.misses += 1
+        html = render_block(block)
+        self.entries[key] = html
+        if self.added is not None:
+            self.added[key] = html
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return html
+
+    def take_changes(self):
+        """Return and reset the hits, misses and new entries since the last call
+
+        Used by worker processes, each holding a copy of the cache, to report
+        back to the parent's cache through merge()
+        """
+        changes = (self.hits, self.misses, self.added or {})
+        self.hits = 0
+        self.misses = 0
+        self.added = {}
+        return changes
+
+    def merge(self, changes):
+        """Add hits, misses and entries reported by take_changes()"""
+        hits, misses, added = changes
+        self.hits += hits
+        self.misses += misses
+        for key, html in added.items():
+            self.entries[key] = html
+            self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def stats(self):
+        """Hit and miss counts, entry count and hit rate"""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(self.entries),
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def save(self):
+        """Write the cache to its path atomically"""
+        if self.path is None:
+            return
+        save_json(self.path, {"version": RENDERER_VERSION, "entries": self.entries})
@@ -0,0 +1,107 @@
+"""Module providing precompressed .gz and .br siblings of the site's text outputs"""
+
+import gzip
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from assets import scan_files
+from output import write_atomic
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE = (".html", ".css")
+COMPRESS_THREADS = os.cpu_count() or 1
+
+
+def gzip_bytes(data: bytes):
+    """gzip data reproducibly, with no timestamp in the header"""
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def brotli_bytes(data: bytes):
+    """Compress data with brotli at its highest quality"""
+    return brotli.compress(data, quality=11)
+
+
+ENCODERS = {".gz": gzip_bytes}
+if brotli is not None:
+    ENCODERS[".br"] = brotli_bytes
+
+
+def is_compressible(path: str):
+    """Check whether an output gets precompressed siblings"""
+    return path.lower().endswith(COMPRESSIBLE)
+
+
+def is_sibling(path: str):
+    """Check whether an output is a precompressed sibling of another output"""
+    base, ext = os.path.splitext(path)
+    return ext in (".gz", ".br") and is_compressible(base)
+
+
+def is_up_to_date(path: str, sibling: str):
+    """Check whether a sibling was compressed from the current version of path
+
+    Siblings are given their source's mtime when written, so any edit to the
+    source, or a sibling written some other way, shows up as a mismatch
+    """
+    try:
+        return os.stat(sibling).st_mtime_ns == os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return False
+
+
+def compress_file(path: str, encoders=None):
+    """Write the out of date siblings of path; returns how many were written"""
+    encoders = ENCODERS if encoders is None else encoders
+    stale = [ext for ext in encoders if not is_up_to_date(path, path + ext)]
+    if not stale:
+        return 0
+    stat = os.stat(path)
+    with open(path, "rb") as file:
+        data = file.read()
+    for ext in stale:
+        write_atomic(path + ext, encoders[ext](data))
+        os.utime(path + ext, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    return len(stale)
+
+
+def compress_outputs(
+    dest_dir: str, threads=COMPRESS_THREADS, encoders=None, logging=False
+):
+    """Precompress every HTML and CSS file under dest_dir on a pool of threads
+
+    zlib and brotli release the GIL while compressing, so threads run in
+    parallel. Files whose siblings are up to date are skipped, and siblings
+    whose source is gone are removed. Returns counts of files compressed,
+    skipped and removed, and the seconds it took
+    """
+    encoders = ENCODERS if encoders is None else encoders
+    start = time.perf_counter()
+    files = scan_files(dest_dir, dest_dir)
+    paths = {path for path, _, _ in files}
+    sources = sorted(path for path in paths if is_compressible(path))
+    removed = 0
+    for path in sorted(paths):
+        if is_sibling(path) and os.path.splitext(path)[0] not in paths:
+            if logging:
+                print(f"Removing: {path}")
+            os.remove(path)
+            removed += 1
+    with ThreadPoolExecutor(threads) as pool:
+        written = list(pool.map(lambda path: compress_file(path, encoders), sources))
+    if logging:
+        for path, count in zip(sources, written):
+            if count:
+                print(f"Compressed: {path}")
+    compressed = sum(1 for count in written if count)
+    return {
+        "compressed": compressed,
+        "skipped": len(sources) - compressed,
+        "removed": removed,
+        "seconds": time.perf_counter() - start,
+    }
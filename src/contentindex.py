@@ -0,0 +1,84 @@
+"""Module providing ContentIndex, a persistent listing of the content tree"""
+
+import json
+import os
+import time
+
+from output import save_json
+
+INDEX_VERSION = 1
+# directories modified this recently may change again within the same mtime tick
+RACY_WINDOW_NS = 2_000_000_000
+
+
+class ContentIndex:
+    """Listing of every file's size and mtime, revalidated per directory by mtime
+
+    A directory's mtime only changes when entries are added, removed or renamed,
+    so the sizes and mtimes of files in an unchanged directory may be stale;
+    use a manifest to detect edited files
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path
+        self.dirs = {}
+        self.rescanned = 0
+        self.reused = 0
+        self._changed = False
+        if path is not None and os.path.exists(path):
+            with open(path, encoding="utf-8") as file:
+                data = json.load(file)
+            if data.get("version") == INDEX_VERSION:
+                self.dirs = data["dirs"]
+
+    def list_dir(self, dir_path: str):
+        """Return the listing of dir_path, rescanning it only if its mtime changed"""
+        mtime = os.stat(dir_path).st_mtime_ns
+        entry = self.dirs.get(dir_path)
+        if entry is not None and entry["mtime"] == mtime:
+            self.reused += 1
+            return entry
+        dirs, files = [], {}
+        with os.scandir(dir_path) as entries:
+            for item in entries:
+                if item.is_dir():
+                    dirs.append(item.name)
+                elif item.is_file():
+                    stat = item.stat()
+                    files[item.name] = [stat.st_size, stat.st_mtime_ns]
+        if time.time_ns() - mtime < RACY_WINDOW_NS:
+            mtime = None
+        entry = {"mtime": mtime, "dirs": sorted(dirs), "files": files}
+        self.dirs[dir_path] = entry
+        self.rescanned += 1
+        self._changed = True
+        return entry
+
+    def scan(self, root: str):
+        """List (path, size, mtime_ns) for every file under root, sorted by path"""
+        files = []
+        visited = set()
+        pending = [(root, None)]
+        while pending:
+            path, stat = pending.pop()
+            if stat is not None:
+                files.append((path, *stat))
+                continue
+            visited.add(path)
+            entry = self.list_dir(path)
+            base = os.path.join(path, "")
+            names = sorted([*entry["dirs"], *entry["files"]], reverse=True)
+            pending.extend((base + name, entry["files"].get(name)) for name in names)
+        prefix = os.path.join(root, "")
+        for dir_path in [d for d in self.dirs if d.startswith(prefix)]:
+            if dir_path not in visited:
+                del self.dirs[dir_path]
+                self._changed = True
+        return files
+
+    def save(self):
+        """Write the index to disk atomically, if it changed"""
+        if self.path is None or not self._changed:
+            return
+        save_json(self.path, {"version": INDEX_VERSION, "dirs": self.dirs})
+        self._changed = False
@@ -0,0 +1,210 @@
+"""Module providing DependencyGraph, which tracks what each page was built from"""
+
+import argparse
+import json
+import os
+from urllib.parse import unquote, urlsplit
+
+from output import save_json
+
+GRAPH_VERSION = 2
+EDGE_KINDS = ("template", "link", "image")
+
+
+class DependencyGraph:
+    """Edges from every page to its template, the pages it links to and its images
+
+    Link and image edges point at every file the URL may resolve to, whether
+    it exists or not, so adding, removing or renaming a page invalidates the
+    pages linking to it. The URLs themselves are kept too, as the site's
+    link index
+    """
+
+    def __init__(self, path: str = None, content_dir="content", static_dir="static"):
+        self.path = path
+        self.content_dir = content_dir
+        self.static_dir = static_dir
+        self.pages = {}
+        self._recorded = set()
+        self._dependents = None
+        if path is not None and os.path.exists(path):
+            with open(path, encoding="utf-8") as file:
+                data = json.load(file)
+            if data.get("version") == GRAPH_VERSION:
+                self.pages = data["pages"]
+
+    def __getstate__(self):
+        return {
+            "path": None,
+            "content_dir": self.content_dir,
+            "static_dir": self.static_dir,
+            "pages": {},
+            "_recorded": set(),
+            "_dependents": None,
+        }
+
+    def url_targets(self, url: str, source: str, image=False):
+        """Files a link or image URL on the page source may point to"""
+        parts = urlsplit(url)
+        if parts.scheme or parts.netloc or not parts.path:
+            return []
+        path = unquote(parts.path)
+        if path.startswith("/"):
+            relative = os.path.normpath(path.lstrip("/") or ".")
+        else:
+            relative = os.path.relpath(
+                os.path.normpath(os.path.join(os.path.dirname(source), path)),
+                self.content_dir,
+            )
+        if relative.startswith(".."):
+            return []
+        if image:
+            return [os.path.join(self.static_dir, relative)]
+        if relative == ".":
+            return [os.path.join(self.content_dir, "index.md")]
+        stem, ext = os.path.splitext(relative)
+        if ext.lower() in (".html", ".htm"):
+            return [os.path.join(self.content_dir, f"{stem}.md")]
+        if ext:
+            return [
+                os.path.join(self.content_dir, relative),
+                os.path.join(self.static_dir, relative),
+            ]
+        return [
+            os.path.join(self.content_dir, f"{relative}.md"),
+            os.path.join(self.content_dir, relative, "index.md"),
+        ]
+
+    def record(self, source: str, dest: str, template: str, links=(), images=()):
+        """Replace the edges and URLs of source with its template, links and images"""
+        link_targets = {}
+        for url in links:
+            link_targets.update(dict.fromkeys(self.url_targets(url, source)))
+        image_targets = {}
+        for url in images:
+            image_targets.update(dict.fromkeys(self.url_targets(url, source, True)))
+        self.pages[source] = {
+            "output": dest,
+            "template": [template],
+            "link": list(link_targets),
+            "image": list(image_targets),
+            "urls": {"link": list(links), "image": list(images)},
+        }
+        self._recorded.add(source)
+        self._dependents = None
+
+    def record_document(self, document, dest: str, template: str):
+        """record() the links and images of a Document"""
+        self.record(document.source, dest, template, *document.references)
+
+    def forget(self, source: str):
+        """Drop a page that no longer exists"""
+        if self.pages.pop(source, None) is not None:
+            self._dependents = None
+
+    def prune(self, sources):
+        """Forget every page not in sources; returns the pages forgotten"""
+        sources = set(sources)
+        removed = sorted(source for source in self.pages if source not in sources)
+        for source in removed:
+            self.forget(source)
+        return removed
+
+    def inputs(self, source: str, template: str):
+        """Files whose content is part of the page's output: template and images"""
+        entry = self.pages.get(source)
+        if entry is None:
+            return [template]
+        return [*entry["template"], *entry["image"]]
+
+    def dependencies(self, source: str):
+        """Edges of a page, by kind"""
+        entry = self.pages.get(source, {})
+        return {kind: entry.get(kind, []) for kind in EDGE_KINDS}
+
+    def dependents(self, path: str):
+        """Sorted (page, kind) pairs of the pages with an edge to path"""
+        if self._dependents is None:
+            self._dependents = {}
+            for source, entry in self.pages.items():
+                for kind in EDGE_KINDS:
+                    for target in entry[kind]:
+                        self._dependents.setdefault(target, []).append((source, kind))
+        return sorted(self._dependents.get(os.path.normpath(path), []))
+
+    def affected(self, changed):
+        """Sorted (source, output) pages to rebuild after the changed files changed
+
+        Only pages already in the graph are returned: an edited page itself,
+        the pages using a changed template or image, and the pages linking to
+        a page that is not in the graph, because it was added or forgotten
+        """
+        sources = set()
+        for path in changed:
+            path = os.path.normpath(path)
+            known_page = path in self.pages
+            if known_page:
+                sources.add(path)
+            sources.update(
+                source
+                for source, kind in self.dependents(path)
+                if kind != "link" or not known_page
+            )
+        return sorted((source, self.pages[source]["output"]) for source in sources)
+
+    def take_changes(self):
+        """Return and reset the pages recorded since the last call"""
+        changes = {source: self.pages[source] for source in self._recorded}
+        self._recorded = set()
+        return changes
+
+    def merge(self, changes):
+        """Add pages recorded by a worker's graph"""
+        self.pages.update(changes)
+        self._dependents = None
+
+    def describe(self, path: str):
+        """Lines explaining what path depends on and what depends on it"""
+        path = os.path.normpath(path)
+        lines = [path]
+        if path in self.pages:
+            lines.append(f"  output: {self.pages[path]['output']}")
+            for kind, targets in self.dependencies(path).items():
+                lines.extend(f"  depends on ({kind}): {target}" for target in targets)
+        for source, kind in self.dependents(path):
+            lines.append(f"  needed by ({kind}): {source}")
+        if len(lines) == 1:
+            lines.append("  not in the graph")
+        return lines
+
+    def save(self):
+        """Write the graph to disk atomically"""
+        save_json(self.path, {"version": GRAPH_VERSION, "pages": self.pages})
+
+
+def main(argv=None):
+    """Print the dependencies recorded for paths, or what they would rebuild"""
+    from main import DEPS_PATH
+
+    parser = argparse.ArgumentParser(
+        description="Show what pages depend on, from the last incremental build"
+    )
+    parser.add_argument("paths", nargs="*", help="pages, templates or images")
+    parser.add_argument("--graph", default=DEPS_PATH, help="dependency graph file")
+    parser.add_argument(
+        "--changed",
+        action="store_true",
+        help="list the outputs to rebuild if all paths changed, instead",
+    )
+    args = parser.parse_args(argv)
+    graph = DependencyGraph(args.graph)
+    if args.changed:
+        for source, output in graph.affected(args.paths):
+            print(f"{source} -> {output}")
+    else:
+        for query in args.paths or sorted(graph.pages):
+            print("\n".join(graph.describe(query)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""Module providing Document, a markdown page tokenized once"""
+
+from depgraph import DependencyGraph
+from htmlnode import ParentNode
+from profiling import BuildProfiler, stage
+from rendercache import RenderCache
+from textnode import (
+    BlockType,
+    TextType,
+    block_inline_texts,
+    block_to_html_node,
+    scan_blocks,
+    text_to_textnodes,
+)
+
+
+def scan_references(block_type: BlockType, block: str, links: list, images: list):
+    """Append the URLs of the links and images a block renders to links and images
+
+    The URLs come from the same TextNodes the block is rendered from, so
+    code spans and images inside link brackets are read as in the HTML
+    """
+    for text in block_inline_texts(block_type, block):
+        for node in text_to_textnodes(text):
+            if node.text_type == TextType.LINK:
+                links.append(node.url)
+            elif node.text_type == TextType.IMAGE:
+                images.append(node.url)
+
+
+def collect_references(blocks, links: list, images: list):
+    """Pass (block_type, block) pairs through, scanning each for references"""
+    for block_type, block in blocks:
+        scan_references(block_type, block, links, images)
+        yield block_type, block
+
+
+class Document:
+    """Markdown document split into classified blocks in a single pass
+
+    The block list is shared by everything that needs the document's
+    structure: the title and other template metadata, and the HTML body
+    """
+
+    def __init__(self, markdown: str, source: str = None):
+        self.source = source
+        self.blocks = list(scan_blocks(markdown))
+        self._title = None
+
+    @classmethod
+    def from_file(cls, path: str):
+        """Read and tokenize a markdown file"""
+        with open(path, encoding="utf-8") as file:
+            return cls(file.read(), path)
+
+    @property
+    def title(self):
+        """Text of the first h1 heading"""
+        if self._title is None:
+            for block_type, block in self.blocks:
+                if block_type == BlockType.HEADING and block.startswith("# "):
+                    self._title = block.lstrip("#").strip()
+                    break
+            else:
+                raise ValueError("Markdown requires h1 tag")
+        return self._title
+
+    @property
+    def references(self):
+        """URLs of the links and of the images the document renders"""
+        links, images = [], []
+        for block_type, block in self.blocks:
+            scan_references(block_type, block, links, images)
+        return links, images
+
+    @property
+    def metadata(self):
+        """Values available to the template besides the content"""
+        return {"Title": self.title, "Source": self.source or ""}
+
+    def html_node(self, cache=None):
+        """Convert the blocks to a full html node, through a BlockCache if given"""
+        return ParentNode(
+            "div",
+            [
+                block_to_html_node(block_type, block, cache)
+                for block_type, block in self.blocks
+            ],
+        )
+
+    def template_values(self, cache=None):
+        """Metadata and the HTML body, ready to fill in a template"""
+        return {**self.metadata, "Content": self.html_node(cache)}
+
+
+def page_values(
+    markdown: str,
+    source: str,
+    dest: str,
+    template_path: str,
+    profiler: BuildProfiler = None,
+    cache=None,
+    render_cache: RenderCache = None,
+    graph: DependencyGraph = None,
+):
+    """Values to fill the template with for a page, reusing its body if cached
+
+    The body is taken from render_cache when it holds this markdown, and
+    stored there otherwise; graph records the page's dependencies
+    """
+    cache_key = None if render_cache is None else render_cache.key(markdown)
+    cached = None if render_cache is None else render_cache.get(cache_key)
+    if cached is not None:
+        title, body = cached
+        if graph is not None:
+            graph.record_document(Document(markdown, source), dest, template_path)
+        return {"Title": title, "Source": source, "Content": body}
+    with stage(profiler, "block scan", source):
+        document = Document(markdown, source)
+        values = document.metadata
+    with stage(profiler, "inline parse", source):
+        values["Content"] = document.html_node(cache)
+    if render_cache is not None or profiler is not None:
+        with stage(profiler, "html serialization", source):
+            values["Content"] = values["Content"].to_html()
+    if render_cache is not None:
+        render_cache.put(cache_key, values["Title"], values["Content"])
+    if graph is not None:
+        graph.record_document(document, dest, template_path)
+    return values
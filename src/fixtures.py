@@ -0,0 +1,37 @@
+"""Helpers shared by the tests"""
+
+import os
+import tempfile
+
+
+class TempDirMixin:
+    """Gives each test a temporary directory, self.tmp, removed after the test
+
+    Mix into a unittest.TestCase, before it in the bases
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def tmp_path(self, name):
+        """Path inside the temporary directory"""
+        return os.path.join(self.tmp.name, name)
+
+    def write(self, name, data, mtime=None):
+        """Write text or bytes to a file in the temporary directory
+
+        Creates its folder, and sets its mtime in nanoseconds if given
+        """
+        path = self.tmp_path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if isinstance(data, bytes):
+            with open(path, "wb") as file:
+                file.write(data)
+        else:
+            with open(path, "w", encoding="utf-8") as file:
+                file.write(data)
+        if mtime is not None:
+            os.utime(path, ns=(mtime, mtime))
+        return path
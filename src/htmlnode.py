@@ -4,6 +4,8 @@
 class HTMLNode:
     """HTML Node - base class"""
 
+    __slots__ = ("tag", "value", "children", "props")
+
     def __init__(self, tag=None, value=None, children=None, props=None):
         self.tag = tag
         self.value = value
@@ -14,6 +16,15 @@ class HTMLNode:
         """Returns HTML; not implemented on base class"""
         raise NotImplementedError()
 
+    def iter_html(self):
+        """Yields HTML in chunks; not implemented on base class"""
+        raise NotImplementedError()
+
+    def write_html(self, sink):
+        """Write HTML to a file-like sink without building the whole string"""
+        for chunk in self.iter_html():
+            sink.write(chunk)
+
     def props_to_html(self):
         """converts props dictionary to appropriate html"""
         if self.props is not None:
@@ -35,6 +46,8 @@ class HTMLNode:
 class LeafNode(HTMLNode):
     """Leaf nodes, cannot contain children, must contain value"""
 
+    __slots__ = ()
+
     def __init__(self, tag, value, props=None):
         super().__init__(tag, value, None, props)
 
@@ -46,14 +59,23 @@ class LeafNode(HTMLNode):
             return f"<{self.tag}{self.props_to_html()}>{self.value}</{self.tag}>"
         return self.value
 
+    def iter_html(self):
+        yield self.to_html()
+
 
 class ParentNode(HTMLNode):
     """Leaf nodes, cannot contain value, must contain children"""
 
+    __slots__ = ()
+
     def __init__(self, tag, children, props=None):
         super().__init__(tag, None, children, props)
 
     def to_html(self):
+        return "".join(self.iter_html())
+
+    def check(self):
+        """Raise if this node cannot be rendered"""
         if not self.tag:
             raise ValueError("Missing tag")
         if not self.children:
@@ -62,8 +84,24 @@ class ParentNode(HTMLNode):
             if not isinstance(c, HTMLNode):
                 print(self)
                 raise TypeError("Expecting HTML Node")
-        return "".join(
-            [f"<{self.tag}{self.props_to_html()}>"]
-            + [c.to_html() for c in self.children]
-            + [f"</{self.tag}>"]
-        )
+
+    def iter_html(self):
+        """Yields HTML in chunks, depth-first with an explicit stack
+
+        Memory use is bounded by the depth of the tree rather than its size
+        """
+        self.check()
+        yield f"<{self.tag}{self.props_to_html()}>"
+        stack = [(iter(self.children), f"</{self.tag}>")]
+        while stack:
+            children, closing_tag = stack[-1]
+            child = next(children, None)
+            if child is None:
+                stack.pop()
+                yield closing_tag
+            elif isinstance(child, ParentNode):
+                child.check()
+                yield f"<{child.tag}{child.props_to_html()}>"
+                stack.append((iter(child.children), f"</{child.tag}>"))
+            else:
+                yield from child.iter_html()
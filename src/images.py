@@ -0,0 +1,357 @@
+"""Module providing ImageProcessor, which sizes img tags and downscales large PNGs"""
+
+import os
+import re
+import struct
+import threading
+import zlib
+from urllib.parse import unquote, urljoin, urlsplit
+
+from assets import place_file
+from manifest import file_hash
+from output import same_files, write_atomic
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+PNG_CHANNELS = {0: 1, 2: 3, 4: 2, 6: 4}
+PNG_COLOR_TYPES = {channels: color for color, channels in PNG_CHANNELS.items()}
+JPEG_SOF_MARKERS = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+IMG_TAG_PATTERN = re.compile(r"<img\b([^>]*)>")
+SRC_PATTERN = re.compile(r'\ssrc="([^"]*)"')
+VARIANT_PATTERN = re.compile(r"\.\d+w\.png$")
+
+
+def jpeg_size(file):
+    """Width and height from the first start-of-frame segment of a JPEG file"""
+    file.seek(2)
+    while True:
+        byte = file.read(1)
+        while byte == b"\xff":
+            byte = file.read(1)
+        if not byte:
+            return None
+        marker = byte[0]
+        if marker == 0x01 or 0xD0 <= marker <= 0xD9:
+            continue
+        header = file.read(2)
+        if len(header) < 2:
+            return None
+        (length,) = struct.unpack(">H", header)
+        if marker in JPEG_SOF_MARKERS:
+            frame = file.read(5)
+            if len(frame) < 5:
+                return None
+            height, width = struct.unpack(">HH", frame[1:5])
+            return width, height
+        file.seek(length - 2, os.SEEK_CUR)
+
+
+def image_size(path: str):
+    """Width and height of a PNG or JPEG read from its header, or None"""
+    try:
+        with open(path, "rb") as file:
+            head = file.read(24)
+            if head.startswith(PNG_SIGNATURE) and head[12:16] == b"IHDR":
+                return struct.unpack(">II", head[16:24])
+            if head.startswith(b"\xff\xd8"):
+                return jpeg_size(file)
+    except (FileNotFoundError, IsADirectoryError):
+        pass
+    return None
+
+
+def paeth(left: int, up: int, up_left: int):
+    """The PNG Paeth predictor"""
+    estimate = left + up - up_left
+    to_left = abs(estimate - left)
+    to_up = abs(estimate - up)
+    to_up_left = abs(estimate - up_left)
+    if to_left <= to_up and to_left <= to_up_left:
+        return left
+    return up if to_up <= to_up_left else up_left
+
+
+def unfilter(kind: int, row: bytearray, previous: bytearray, bpp: int):
+    """Undo the PNG filter of one scanline in place"""
+    if kind == 1:
+        for i in range(bpp, len(row)):
+            row[i] = (row[i] + row[i - bpp]) & 0xFF
+    elif kind == 2:
+        row[:] = bytes([(a + b) & 0xFF for a, b in zip(row, previous)])
+    elif kind == 3:
+        for i in range(len(row)):
+            left = row[i - bpp] if i >= bpp else 0
+            row[i] = (row[i] + ((left + previous[i]) >> 1)) & 0xFF
+    elif kind == 4:
+        for i in range(len(row)):
+            if i >= bpp:
+                predicted = paeth(row[i - bpp], previous[i], previous[i - bpp])
+            else:
+                predicted = previous[i]
+            row[i] = (row[i] + predicted) & 0xFF
+    elif kind != 0:
+        raise ValueError(f"Invalid PNG filter type {kind}")
+
+
+def read_png(path: str):
+    """Decode a PNG to (width, height, channels, rows) of 8-bit samples
+
+    Returns None unless the image is 8-bit, non-interlaced grey or RGB,
+    with or without alpha. Raises ValueError, struct.error or zlib.error
+    if the file is corrupt
+    """
+    with open(path, "rb") as file:
+        data = file.read()
+    if not data.startswith(PNG_SIGNATURE):
+        return None
+    header = None
+    compressed = []
+    position = len(PNG_SIGNATURE)
+    while position + 8 <= len(data):
+        length, kind = struct.unpack(">I4s", data[position : position + 8])
+        body = data[position + 8 : position + 8 + length]
+        if kind == b"IHDR":
+            header = struct.unpack(">IIBBBBB", body)
+        elif kind == b"IDAT":
+            compressed.append(body)
+        elif kind == b"IEND":
+            break
+        position += 12 + length
+    if header is None:
+        return None
+    width, height, depth, color, _, _, interlace = header
+    channels = PNG_CHANNELS.get(color)
+    if depth != 8 or channels is None or interlace:
+        return None
+    raw = zlib.decompress(b"".join(compressed))
+    stride = width * channels
+    if len(raw) < height * (stride + 1):
+        raise ValueError("Truncated PNG image data")
+    rows = []
+    previous = bytearray(stride)
+    for y in range(height):
+        start = y * (stride + 1)
+        row = bytearray(raw[start + 1 : start + 1 + stride])
+        unfilter(raw[start], row, previous, channels)
+        rows.append(row)
+        previous = row
+    return width, height, channels, rows
+
+
+def downscale(width: int, height: int, channels: int, rows: list, factor: int):
+    """Shrink an image by an integer factor, averaging factor x factor boxes
+
+    Pixels past the last whole box on the right and bottom edges are dropped
+    """
+    new_width = width // factor
+    step = factor * channels
+    area = factor * factor
+    new_rows = []
+    for y in range(height // factor):
+        column_sums = list(map(sum, zip(*rows[y * factor : (y + 1) * factor])))
+        new_row = bytearray(new_width * channels)
+        for channel in range(channels):
+            columns = [
+                column_sums[channel + k * channels :: step][:new_width]
+                for k in range(factor)
+            ]
+            new_row[channel::channels] = bytes(
+                [total // area for total in map(sum, zip(*columns))]
+            )
+        new_rows.append(new_row)
+    return new_width, height // factor, new_rows
+
+
+def png_chunk(kind: bytes, body: bytes):
+    """A PNG chunk with its length and CRC"""
+    return struct.pack(">I", len(body)) + kind + body + struct.pack(
+        ">I", zlib.crc32(kind + body)
+    )
+
+
+def encode_png(width: int, height: int, channels: int, rows: list):
+    """Encode rows of 8-bit pixels as a PNG"""
+    header = struct.pack(
+        ">IIBBBBB", width, height, 8, PNG_COLOR_TYPES[channels], 0, 0, 0
+    )
+    raw = b"".join(b"\x00" + bytes(row) for row in rows)
+    return b"".join(
+        [
+            PNG_SIGNATURE,
+            png_chunk(b"IHDR", header),
+            png_chunk(b"IDAT", zlib.compress(raw, 9)),
+            png_chunk(b"IEND", b""),
+        ]
+    )
+
+
+def is_variant(path: str):
+    """Check whether an output path is a downscaled variant of an image"""
+    return VARIANT_PATTERN.search(path) is not None
+
+
+def file_version(path: str):
+    """(path, mtime, size) identifying the current content of path, or None"""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (path, stat.st_mtime_ns, stat.st_size)
+
+
+class ImageProcessor:
+    """Adds width and height to img tags in pages, from the images' headers
+
+    With max_width, PNGs wider than that are shrunk by an integer factor
+    and the tag points at the smaller copy. Copies are kept in cache_dir
+    under the hash of the original, so each is produced once across builds
+    """
+
+    def __init__(
+        self, static_dir: str, dest_dir: str, cache_dir: str = None, max_width=None
+    ):
+        self.static_dir = static_dir
+        self.dest_dir = dest_dir
+        self.cache_dir = cache_dir
+        self.max_width = max_width
+        self.created = 0
+        self.reused = 0
+        self._sizes = {}
+        self._variants = {}
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        return {
+            "static_dir": self.static_dir,
+            "dest_dir": self.dest_dir,
+            "cache_dir": self.cache_dir,
+            "max_width": self.max_width,
+        }
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def source_path(self, src: str, dest_path: str):
+        """Static file an img src on the page written to dest_path refers to"""
+        parts = urlsplit(src)
+        if parts.scheme or parts.netloc or not parts.path:
+            return None
+        page_url = os.path.relpath(dest_path, self.dest_dir).replace(os.sep, "/")
+        path = unquote(urlsplit(urljoin(f"/{page_url}", parts.path)).path)
+        return os.path.join(self.static_dir, *path.lstrip("/").split("/"))
+
+    def size(self, path: str):
+        """image_size(), remembered until the file changes"""
+        key = file_version(path)
+        if key is None:
+            return None
+        if key not in self._sizes:
+            self._sizes[key] = image_size(path)
+        return self._sizes[key]
+
+    def cached_variant(self, path: str, width: int):
+        """Path of the cached downscaled copy of path, creating it if needed"""
+        cache_path = os.path.join(self.cache_dir, f"{file_hash(path)}-{width}w.png")
+        if os.path.exists(cache_path):
+            with self._lock:
+                self.reused += 1
+            return cache_path
+        try:
+            image = read_png(path)
+        except (ValueError, struct.error, zlib.error):
+            image = None
+        if image is None:
+            return None
+        image_width, height, channels, rows = image
+        factor = min(-(-image_width // width), image_width, height)
+        new_width, new_height, new_rows = downscale(
+            image_width, height, channels, rows, factor
+        )
+        os.makedirs(self.cache_dir, exist_ok=True)
+        write_atomic(cache_path, encode_png(new_width, new_height, channels, new_rows))
+        with self._lock:
+            self.created += 1
+        return cache_path
+
+    def variant(self, path: str):
+        """(name, size) of the downscaled copy of path published next to it
+
+        None if path cannot be downscaled
+        """
+        key = file_version(path)
+        if key not in self._variants:
+            self._variants[key] = None
+            cache_path = self.cached_variant(path, self.max_width)
+            if cache_path is not None:
+                size = image_size(cache_path)
+                stem = os.path.splitext(os.path.basename(path))[0]
+                name = f"{stem}.{size[0]}w.png"
+                dest = os.path.join(
+                    self.dest_dir,
+                    os.path.dirname(os.path.relpath(path, self.static_dir)),
+                    name,
+                )
+                if not same_files(cache_path, dest):
+                    os.makedirs(os.path.dirname(dest), exist_ok=True)
+                    place_file(cache_path, dest)
+                self._variants[key] = (name, size)
+        return self._variants[key]
+
+    def rewrite_tag(self, match: re.Match, dest_path: str):
+        """An img tag with width and height, and the src of a smaller copy"""
+        attributes = match.group(1)
+        src_match = SRC_PATTERN.search(attributes)
+        if src_match is None or " width=" in attributes:
+            return match.group()
+        path = self.source_path(src_match.group(1), dest_path)
+        size = None if path is None else self.size(path)
+        if size is None:
+            return match.group()
+        src = src_match.group(1)
+        if self.max_width and size[0] > self.max_width and self.cache_dir:
+            variant = self.variant(path)
+            if variant is not None:
+                name, size = variant
+                src = f"{src.rpartition('/')[0]}/{name}" if "/" in src else name
+        attributes = (
+            f"{attributes[: src_match.start(1)]}{src}{attributes[src_match.end(1) :]}"
+        )
+        return f'<img{attributes} width="{size[0]}" height="{size[1]}">'
+
+    def rewrite(self, html: str, dest_path: str):
+        """Size every img tag in a page written to dest_path"""
+        if "<img" not in html:
+            return html
+        return IMG_TAG_PATTERN.sub(
+            lambda match: self.rewrite_tag(match, dest_path), html
+        )
+
+    def take_changes(self):
+        """Return and reset the copies created and reused since the last call"""
+        with self._lock:
+            changes = (self.created, self.reused)
+            self.created = 0
+            self.reused = 0
+        return changes
+
+    def merge(self, changes):
+        """Add counts reported by a worker's processor"""
+        created, reused = changes
+        with self._lock:
+            self.created += created
+            self.reused += reused
+
+
+class SizingSink:
+    """File-like sink passing what is written through ImageProcessor.rewrite()
+
+    For streamed pages, whose chunks each hold whole tags
+    """
+
+    def __init__(self, processor: ImageProcessor, sink, dest_path: str):
+        self.processor = processor
+        self.sink = sink
+        self.dest_path = dest_path
+
+    def write(self, text: str):
+        """Write text with its img tags sized"""
+        return self.sink.write(self.processor.rewrite(text, self.dest_path))
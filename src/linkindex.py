@@ -0,0 +1,86 @@
+"""Module providing LinkIndex, the site's links and images, checked during the build"""
+
+import json
+import os
+from urllib.parse import unquote, urljoin, urlsplit
+
+from assets import scan_files
+
+
+class LinkIndex:
+    """Every page's link and image URLs, checked against the site's outputs
+
+    Internal targets are resolved to site paths and looked up in a set of the
+    generated pages and static files, so each check is a few set lookups
+    """
+
+    def __init__(self, dest_dir: str):
+        self.dest_dir = dest_dir
+        self.pages = {}
+        self.targets = set()
+
+    @classmethod
+    def from_graph(cls, graph, dest_dir: str, static_dir: str = None):
+        """Index the pages recorded in a DependencyGraph, and the static files"""
+        index = cls(dest_dir)
+        for source, entry in sorted(graph.pages.items()):
+            urls = entry["urls"]
+            index.add_page(source, entry["output"], urls["link"], urls["image"])
+        if static_dir is not None and os.path.isdir(static_dir):
+            for _, dest, _ in scan_files(static_dir, dest_dir):
+                index.add_target(dest)
+        return index
+
+    def site_path(self, dest: str):
+        """URL path of an output file, from the site root"""
+        return "/" + os.path.relpath(dest, self.dest_dir).replace(os.sep, "/")
+
+    def add_target(self, dest: str):
+        """Record an output file that links may point to"""
+        self.targets.add(self.site_path(dest))
+
+    def add_page(self, source: str, dest: str, links=(), images=()):
+        """Record a generated page and the URLs it references"""
+        url = self.site_path(dest)
+        self.pages[source] = {"url": url, "links": list(links), "images": list(images)}
+        self.targets.add(url)
+
+    def resolve(self, url: str, page_url: str):
+        """Site path a URL on the page at page_url points to; None if external"""
+        parts = urlsplit(url)
+        if parts.scheme or parts.netloc or not parts.path:
+            return None
+        return unquote(urlsplit(urljoin(page_url, parts.path)).path)
+
+    def exists(self, path: str):
+        """Check whether a site path is served, directly or as a page"""
+        if path.endswith("/"):
+            return f"{path}index.html" in self.targets
+        return (
+            path in self.targets
+            or f"{path}.html" in self.targets
+            or f"{path}/index.html" in self.targets
+        )
+
+    def broken(self):
+        """Internal links and images whose target is not in the site, by page"""
+        broken = []
+        for source, page in self.pages.items():
+            for kind, urls in (("link", page["links"]), ("image", page["images"])):
+                for url in urls:
+                    path = self.resolve(url, page["url"])
+                    if path is not None and not self.exists(path):
+                        broken.append({"source": source, "kind": kind, "target": url})
+        return broken
+
+    def to_dict(self):
+        """The index as plain data, for JSON"""
+        return {"pages": self.pages, "broken": self.broken()}
+
+    def write_json(self, path: str):
+        """Write the index to a JSON file"""
+        parent_dir = os.path.dirname(path)
+        if parent_dir:
+            os.makedirs(parent_dir, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(self.to_dict(), file, indent=1)
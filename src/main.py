@@ -1,81 +1,660 @@
 """Main file, currently used for testing"""
 
+import argparse
 import os
-import shutil
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, repeat
 
-from textnode import markdown_to_blocks, markdown_to_html_node
+from assets import (
+    COPY_THREADS,
+    LINK_MODES,
+    copy_files,
+    remove_stale,
+    scan_files,
+    sync_assets,
+    throughput,
+)
+from blockcache import BlockCache
+from compress import ENCODERS, compress_outputs, is_sibling
+from contentindex import ContentIndex
+from depgraph import DependencyGraph
+from document import Document, collect_references, page_values
+from images import ImageProcessor, SizingSink, is_variant
+from linkindex import LinkIndex
+from manifest import BuildManifest
+from output import OutputWriter
+from pipeline import build_pages_pipelined
+from profiling import BuildProfiler, stage
+from rendercache import DEFAULT_MAX_BYTES, RenderCache
+from template import load_template
+from textnode import RENDERER_VERSION, block_to_html_node, scan_block_lines
+from watch import SiteWatcher
 
+CACHE_DIR = ".cache"
+MANIFEST_PATH = os.path.join(CACHE_DIR, "manifest.json")
+PROFILE_PATH = os.path.join(CACHE_DIR, "profile.json")
+BLOCK_CACHE_PATH = os.path.join(CACHE_DIR, "blocks.json")
+INDEX_PATH = os.path.join(CACHE_DIR, "index.json")
+DEPS_PATH = os.path.join(CACHE_DIR, "deps.json")
+LINKS_PATH = os.path.join(CACHE_DIR, "links.json")
+IMAGE_CACHE_DIR = os.path.join(CACHE_DIR, "images")
+STREAM_THRESHOLD = 64 * 1024 * 1024
 
-def main():
+
+def parse_args(argv=None):
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Generate the static site")
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help=f"only re-render pages whose inputs changed, tracked in {MANIFEST_PATH}",
+    )
+    parser.add_argument(
+        "--asset-hash",
+        action="store_true",
+        help="with --incremental, compare static files by content hash, not mtime",
+    )
+    parser.add_argument(
+        "--asset-link",
+        choices=LINK_MODES,
+        default="copy",
+        help="with --incremental, how to place changed static files in public",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="number of worker processes rendering pages, 0 for one per CPU",
+    )
+    parser.add_argument(
+        "--async-io",
+        action="store_true",
+        help="overlap reading and writing pages with rendering, for slow volumes",
+    )
+    parser.add_argument(
+        "--copy-threads",
+        type=int,
+        default=COPY_THREADS,
+        help="number of threads copying static files",
+    )
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const=PROFILE_PATH,
+        metavar="PATH",
+        help=f"time every build stage per page and write a JSON report "
+        f"(default {PROFILE_PATH})",
+    )
+    parser.add_argument(
+        "--link-index",
+        nargs="?",
+        const=LINKS_PATH,
+        metavar="PATH",
+        help=f"write every page's links and images, and the broken ones, to a "
+        f"JSON index (default {LINKS_PATH})",
+    )
+    parser.add_argument(
+        "--image-sizes",
+        action="store_true",
+        help="add width and height to img tags, read from the images' headers",
+    )
+    parser.add_argument(
+        "--image-max-width",
+        type=int,
+        metavar="PIXELS",
+        help="point img tags of wider PNGs at a downscaled copy, cached in "
+        f"{IMAGE_CACHE_DIR}; implies --image-sizes",
+    )
+    parser.add_argument(
+        "--compress",
+        action="store_true",
+        help="write .gz siblings, and .br ones if brotli is installed, of every "
+        "HTML and CSS output",
+    )
+    parser.add_argument(
+        "--block-cache",
+        type=int,
+        nargs="?",
+        const=10_000,
+        metavar="ENTRIES",
+        help="reuse the HTML of blocks repeated across pages, keeping at most "
+        "ENTRIES blocks (default 10000)",
+    )
+    parser.add_argument(
+        "--persist-block-cache",
+        action="store_true",
+        help=f"with --block-cache, keep the cache between builds in {BLOCK_CACHE_PATH}",
+    )
+    parser.add_argument(
+        "--render-cache",
+        metavar="DIR",
+        help="reuse rendered page bodies stored in DIR, which builds may share",
+    )
+    parser.add_argument(
+        "--render-cache-size",
+        type=int,
+        default=DEFAULT_MAX_BYTES // (1024 * 1024),
+        metavar="MB",
+        help="evict least recently used render cache entries beyond this size",
+    )
+    parser.add_argument(
+        "-q",
+        "--quiet",
+        action="store_true",
+        help="do not print a line for every generated page",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="after building, keep rebuilding pages and static files as they change",
+    )
+    args = parser.parse_args(argv)
+    args.image_sizes = args.image_sizes or args.image_max_width is not None
+    if args.jobs < 0:
+        parser.error("--jobs must be 0 or more")
+    if args.image_max_width is not None and args.image_max_width < 1:
+        parser.error("--image-max-width must be 1 or more")
+    args.jobs = args.jobs or os.cpu_count() or 1
+    return args
+
+
+def main(argv=None):
     """Main function, does the work"""
-    copy_source_to_dest("static", "public")
-    # generate_page("content/index.md", "template.html", "public/index.html")
-    generate_pages_recursive("content", "template.html", "public")
+    args = parse_args(argv)
+    profiler = BuildProfiler() if args.profile else None
+    cache = None
+    if args.block_cache:
+        cache = BlockCache(
+            args.block_cache, BLOCK_CACHE_PATH if args.persist_block_cache else None
+        )
+    render_cache = None
+    if args.render_cache:
+        render_cache = RenderCache(
+            args.render_cache, args.render_cache_size * 1024 * 1024
+        )
+    manifest = None
+    index = None
+    graph = DependencyGraph() if args.watch or args.link_index else None
+    if args.incremental:
+        manifest = BuildManifest(
+            MANIFEST_PATH,
+            {
+                "renderer": RENDERER_VERSION,
+                "image_sizes": args.image_sizes,
+                "image_max_width": args.image_max_width,
+            },
+        )
+        index = ContentIndex(INDEX_PATH)
+        graph = DependencyGraph(DEPS_PATH)
 
+    def is_generated(path):
+        return (
+            path in pages
+            or is_variant(path)
+            or (args.compress and is_sibling(path))
+        )
 
-def copy_source_to_dest(source: str, destination: str, logging=False):
-    """clear destination and copy files from source to destination"""
+    with stage(profiler, "static"):
+        pages = {dest for _, dest in find_pages("content", "public", index)}
+        if args.incremental:
+            stats = sync_assets(
+                "static",
+                "public",
+                use_hash=args.asset_hash,
+                link=args.asset_link,
+                keep=is_generated,
+                threads=args.copy_threads,
+            )
+        else:
+            stats = copy_source_to_dest(
+                "static", "public", keep=is_generated, threads=args.copy_threads
+            )
+    if args.incremental:
+        print(
+            f"Synced static: {stats['copied']} copied, "
+            f"{stats['skipped']} unchanged, {stats['removed']} removed"
+        )
+    else:
+        print(f"Copied static: {throughput(stats)}")
+    writer = OutputWriter()
+    images = None
+    if args.image_sizes:
+        images = ImageProcessor(
+            "static", "public", IMAGE_CACHE_DIR, args.image_max_width
+        )
+    generate_pages_recursive(
+        "content",
+        "template.html",
+        "public",
+        manifest,
+        args.jobs,
+        profiler,
+        logging=not args.quiet,
+        cache=cache,
+        render_cache=render_cache,
+        async_io=args.async_io,
+        index=index,
+        writer=writer,
+        graph=graph,
+        images=images,
+    )
+    print(writer.summary())
+    if args.compress:
+        with stage(profiler, "compress"):
+            stats = compress_outputs("public")
+        print(
+            f"Compressed ({', '.join(ENCODERS)}): {stats['compressed']} compressed, "
+            f"{stats['skipped']} up to date, {stats['removed']} removed "
+            f"in {stats['seconds']:.2f} s"
+        )
+    if images is not None and args.image_max_width:
+        print(f"Image copies: {images.created} created, {images.reused} reused")
+    if manifest is not None:
+        manifest.prune(logging=True)
+        manifest.save()
+        index.save()
+        graph.save()
+    if cache is not None:
+        stats = cache.stats()
+        print(
+            f"Block cache: {stats['hits']} hits, {stats['misses']} misses "
+            f"({stats['hit_rate']:.0%}), {stats['entries']} entries"
+        )
+        cache.save()
+    if render_cache is not None:
+        evicted = render_cache.evict()
+        print(
+            f"Render cache: {render_cache.hits} hits, {render_cache.misses} misses, "
+            f"{evicted} evicted"
+        )
+    if profiler is not None:
+        print(profiler.report())
+        profiler.write_json(args.profile)
+        print(f"Profile written to {args.profile}")
+    if args.link_index:
+        links = LinkIndex.from_graph(graph, "public", "static")
+        broken = links.broken()
+        for reference in broken:
+            print(
+                f"Broken {reference['kind']} in {reference['source']}: "
+                f"{reference['target']}"
+            )
+        links.write_json(args.link_index)
+        print(
+            f"Link index: {len(links.pages)} pages, {len(broken)} broken, "
+            f"written to {args.link_index}"
+        )
+    if args.watch:
+        SiteWatcher(
+            "content",
+            "static",
+            "template.html",
+            "public",
+            lambda source, dest: generate_page(
+                source,
+                "template.html",
+                dest,
+                not args.quiet,
+                graph=graph,
+                images=images,
+            ),
+            graph=graph,
+        ).run()
+
+
+def copy_source_to_dest(
+    source: str, destination: str, logging=False, keep=None, threads=COPY_THREADS
+):
+    """copy files from source to destination, removing files not in source
+
+    Files are listed with os.scandir and copied on a pool of threads. Files
+    in destination that keep(path) is true for, like generated pages, are
+    left alone; returns the number of files and bytes copied, and the time
+    it took
+    """
     if not os.path.exists(source):
         raise FileNotFoundError(f"Could not find folder: {source}")
 
+    files = scan_files(source, destination)
+    copied = {dest for _, dest, _ in files}
     if os.path.exists(destination):
-        if logging:
-            print(f"Removing: {destination}")
-        shutil.rmtree(destination)
+        remove_stale(
+            destination,
+            lambda path: path in copied or (keep is not None and keep(path)),
+            logging,
+        )
 
     if logging:
         print(f"Creating folder: {destination}")
-    os.mkdir(destination)
+    os.makedirs(destination, exist_ok=True)
 
-    for file_or_folder in os.listdir(source):
-        new_source = os.path.join(source, file_or_folder)
-        new_destination = os.path.join(destination, file_or_folder)
-        if os.path.isfile(new_source):
-            if logging:
-                print(f"Copying: {new_source} to {new_destination}")
-            shutil.copy(new_source, new_destination)
-        elif os.path.isdir(new_source):
-            copy_source_to_dest(new_source, new_destination)
+    return copy_files(scan_files(source, destination), threads, logging=logging)
 
 
 def extract_title(markdown):
     """Extract h1 tag from markdown"""
-    for block in markdown_to_blocks(markdown):
-        if block.startswith("# "):
-            return block.lstrip("#").strip()
-    raise ValueError("Markdown requires h1 tag")
-
-
-def generate_page(from_path, template_path, dest_path):
-    """Generate page using template to destination"""
-    print(f"Generating page from {from_path} to {dest_path} using {template_path}")
-    parent_dir = os.path.dirname(dest_path)
-    if not os.path.exists(parent_dir):
-        os.mkdir(parent_dir)
-
-    with open(from_path, encoding="utf-8") as file:
-        markdown = file.read()
-    with open(template_path, encoding="utf-8") as file:
-        template = file.read()
-    html = markdown_to_html_node(markdown).to_html()
-    title = extract_title(markdown)
-    template = template.replace("{{ Title }}", title).replace("{{ Content }}", html)
-    with open(dest_path, "w", encoding="utf-8") as file:
-        file.write(template)
-
-
-def generate_pages_recursive(dir_path_content, template_path, dest_dir_path):
-    """Generates pages recurisvely"""
-    for file in os.listdir(dir_path_content):
-        source_file_path = os.path.join(dir_path_content, file)
-        filename, ext = os.path.splitext(file)
+    return Document(markdown).title
+
+
+def generate_page(
+    from_path,
+    template_path,
+    dest_path,
+    logging=True,
+    profiler=None,
+    cache=None,
+    render_cache=None,
+    writer: OutputWriter = None,
+    graph: DependencyGraph = None,
+    images: ImageProcessor = None,
+):
+    """Generate page using template to destination, returning profiled timings
+
+    Without a profiler, sources of STREAM_THRESHOLD bytes or more are streamed
+    """
+    if logging:
+        print(f"Generating page from {from_path} to {dest_path} using {template_path}")
+    if writer is None:
+        writer = OutputWriter()
+    if profiler is None and os.path.getsize(from_path) >= STREAM_THRESHOLD:
+        generate_page_streaming(
+            from_path, template_path, dest_path, False, cache, writer, graph, images
+        )
+        return None
+
+    with stage(profiler, "read", from_path):
+        with open(from_path, encoding="utf-8") as file:
+            markdown = file.read()
+    values = page_values(
+        markdown,
+        from_path,
+        dest_path,
+        template_path,
+        profiler,
+        cache,
+        render_cache,
+        graph,
+    )
+    template = load_template(template_path)
+    with stage(profiler, "template fill", from_path):
+        html = template.render(values)
+        if images is not None:
+            html = images.rewrite(html, dest_path)
+    with stage(profiler, "write", from_path):
+        writer.write(dest_path, html)
+    return None if profiler is None else profiler.pages[from_path]
+
+
+class StreamedContent:
+    """Page body whose blocks are rendered one at a time as it is written
+
+    Renders like ParentNode("div", ...), but blocks come from an iterator,
+    so it can only be written once
+    """
+
+    def __init__(self, blocks, cache=None):
+        self.blocks = blocks
+        self.cache = cache
+
+    def iter_html(self):
+        """Yields HTML in chunks, rendering each block only when it is reached"""
+        yield "<div>"
+        for block_type, block in self.blocks:
+            yield from block_to_html_node(block_type, block, self.cache).iter_html()
+        yield "</div>"
+
+    def write_html(self, sink):
+        """Write HTML to a file-like sink"""
+        for chunk in self.iter_html():
+            sink.write(chunk)
+
+
+def generate_page_streaming(
+    from_path,
+    template_path,
+    dest_path,
+    logging=True,
+    cache=None,
+    writer: OutputWriter = None,
+    graph: DependencyGraph = None,
+    images: ImageProcessor = None,
+):
+    """Generate page reading, rendering and writing it one block at a time
+
+    Only the blocks up to the h1 title are held in memory, so memory use
+    stays flat however large the markdown file is
+    """
+    if logging:
+        print(f"Streaming page from {from_path} to {dest_path} using {template_path}")
+    if writer is None:
+        writer = OutputWriter()
+
+    template = load_template(template_path)
+    link_urls, image_urls = [], []
+    with open(from_path, encoding="utf-8") as source:
+        blocks = scan_block_lines(line.rstrip("\n") for line in source)
+        if graph is not None:
+            blocks = collect_references(blocks, link_urls, image_urls)
+        title_blocks = []
+        for block_type, block in blocks:
+            title_blocks.append((block_type, block))
+            if block.startswith("# "):
+                title = block.lstrip("#").strip()
+                break
+        else:
+            raise ValueError("Markdown requires h1 tag")
+        content = StreamedContent(chain(title_blocks, blocks), cache)
+        with writer.open(dest_path) as file:
+            if images is not None:
+                file = SizingSink(images, file, dest_path)
+            template.render_to(
+                file, {"Title": title, "Source": from_path, "Content": content}
+            )
+    if graph is not None:
+        graph.record(from_path, dest_path, template_path, link_urls, image_urls)
+
+
+def find_pages(dir_path_content, dest_dir_path, index: ContentIndex = None):
+    """Find markdown pages recursively, as sorted (source, destination) pairs"""
+    if index is None:
+        index = ContentIndex()
+    prefix = len(os.path.join(dir_path_content, ""))
+    pages = []
+    for source_file_path, _, _ in index.scan(dir_path_content):
+        relative, ext = os.path.splitext(source_file_path[prefix:])
         if ext.lower() == ".md":
-            dest_file_path = os.path.join(dest_dir_path, f"{filename}.html")
-            generate_page(source_file_path, template_path, dest_file_path)
-        elif os.path.isdir(source_file_path):
-            generate_pages_recursive(
-                source_file_path, template_path, os.path.join(dest_dir_path, filename)
+            pages.append(
+                (source_file_path, os.path.join(dest_dir_path, f"{relative}.html"))
+            )
+    return pages
+
+
+def generate_pages_recursive(
+    dir_path_content,
+    template_path,
+    dest_dir_path,
+    manifest: BuildManifest = None,
+    jobs=1,
+    profiler: BuildProfiler = None,
+    logging=True,
+    cache: BlockCache = None,
+    render_cache: RenderCache = None,
+    async_io=False,
+    index: ContentIndex = None,
+    writer: OutputWriter = None,
+    graph: DependencyGraph = None,
+    images: ImageProcessor = None,
+):
+    """Generates pages recurisvely, skipping unchanged pages if given a manifest"""
+    with stage(profiler, "discovery"):
+        pages = find_pages(dir_path_content, dest_dir_path, index)
+        relinked = set()
+        if graph is not None:
+            sources = {source for source, _ in pages}
+            moved = sources.symmetric_difference(graph.pages)
+            graph.prune(sources)
+            relinked = {source for source, _ in graph.affected(moved)}
+        if manifest is not None:
+            pages = [
+                (source, dest)
+                for source, dest in pages
+                if source in relinked
+                or manifest.is_stale(
+                    source, dest, page_inputs(source, template_path, graph)
+                )
+            ]
+    with stage(profiler, "render"):
+        if jobs > 1 and len(pages) > 1:
+            generate_pages_parallel(
+                pages,
+                template_path,
+                manifest,
+                jobs,
+                profiler,
+                logging,
+                cache,
+                render_cache,
+                writer,
+                graph,
+                images,
+            )
+            return
+        if async_io:
+            for source, dest in build_pages_pipelined(
+                pages,
+                template_path,
+                cache=cache,
+                logging=logging,
+                writer=writer,
+                graph=graph,
+                images=images,
+                render_cache=render_cache,
+                profiler=profiler,
+            ):
+                if manifest is not None:
+                    manifest.record(
+                        source, dest, page_inputs(source, template_path, graph)
+                    )
+            return
+        for source, dest in pages:
+            generate_page(
+                source,
+                template_path,
+                dest,
+                logging,
+                profiler,
+                cache,
+                render_cache,
+                writer,
+                graph,
+                images,
             )
+            if manifest is not None:
+                manifest.record(source, dest, page_inputs(source, template_path, graph))
+
+
+def page_inputs(source, template_path, graph: DependencyGraph = None):
+    """Files besides its source whose content a page's output is built from"""
+    if graph is None:
+        return [template_path]
+    return graph.inputs(source, template_path)
+
+
+def generate_page_in_worker(
+    from_path,
+    template_path,
+    dest_path,
+    profile,
+    cache,
+    render_cache,
+    writer,
+    graph,
+    images,
+):
+    """generate_page() in a worker process, returning its timings and changes"""
+    timings = generate_page(
+        from_path,
+        template_path,
+        dest_path,
+        False,
+        BuildProfiler() if profile else None,
+        cache,
+        render_cache,
+        writer,
+        graph,
+        images,
+    )
+    return (
+        timings,
+        None if cache is None else cache.take_changes(),
+        None if render_cache is None else render_cache.take_changes(),
+        None if writer is None else writer.take_changes(),
+        None if graph is None else graph.take_changes(),
+        None if images is None else images.take_changes(),
+    )
+
+
+def generate_pages_parallel(
+    pages,
+    template_path,
+    manifest=None,
+    jobs=2,
+    profiler=None,
+    logging=True,
+    cache=None,
+    render_cache=None,
+    writer=None,
+    graph=None,
+    images=None,
+):
+    """Render (source, destination) pages on a pool of worker processes
+
+    Workers report their changes back, and pages are logged in serial order
+    """
+    sources = [source for source, _ in pages]
+    dests = [dest for _, dest in pages]
+    chunksize = max(1, len(pages) // (jobs * 4))
+    with ProcessPoolExecutor(min(jobs, len(pages))) as pool:
+        rendered = pool.map(
+            generate_page_in_worker,
+            sources,
+            repeat(template_path),
+            dests,
+            repeat(profiler is not None),
+            repeat(cache),
+            repeat(render_cache),
+            repeat(writer),
+            repeat(graph),
+            repeat(images),
+            chunksize=chunksize,
+        )
+        for (source, dest), changes in zip(pages, rendered):
+            (
+                timings,
+                cache_changes,
+                render_cache_changes,
+                writer_changes,
+                graph_changes,
+                image_changes,
+            ) = changes
+            if logging:
+                print(f"Generated page from {source} to {dest} using {template_path}")
+            if profiler is not None:
+                profiler.add_page(source, timings)
+            if cache is not None:
+                cache.merge(cache_changes)
+            if render_cache is not None:
+                render_cache.merge(render_cache_changes)
+            if writer is not None:
+                writer.merge(writer_changes)
+            if graph is not None:
+                graph.merge(graph_changes)
+            if images is not None:
+                images.merge(image_changes)
+            if manifest is not None:
+                manifest.record(source, dest, page_inputs(source, template_path, graph))
 
 
-main()
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Module providing BuildManifest, used for incremental builds"""
+
+import hashlib
+import json
+import os
+
+from output import save_json
+
+MANIFEST_VERSION = 1
+
+
+def file_hash(path: str):
+    """Return the sha256 hex digest of a file, or None if it does not exist"""
+    digest = hashlib.sha256()
+    try:
+        with open(path, "rb") as file:
+            for chunk in iter(lambda: file.read(1 << 16), b""):
+                digest.update(chunk)
+    except FileNotFoundError:
+        return None
+    return digest.hexdigest()
+
+
+class BuildManifest:
+    """Persistent record of every page's output and the hashes of its inputs
+
+    settings holds the build options that change every page's output; if
+    they differ from the saved ones, every page is stale
+    """
+
+    def __init__(self, path: str, settings: dict = None):
+        self.path = path
+        self.settings = settings or {}
+        self.pages = {}
+        self.seen = set()
+        self._hashes = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as file:
+                data = json.load(file)
+            if (
+                data.get("version") == MANIFEST_VERSION
+                and data.get("settings", {}) == self.settings
+            ):
+                self.pages = data["pages"]
+
+    def hash(self, path: str):
+        """Hash a file, at most once per build"""
+        if path not in self._hashes:
+            self._hashes[path] = file_hash(path)
+        return self._hashes[path]
+
+    def forget(self, path: str):
+        """Drop the memoized hash of a file that changed during this build"""
+        self._hashes.pop(path, None)
+
+    def is_stale(self, source: str, dest: str, dependencies=()):
+        """Check whether source needs to be rendered to dest again"""
+        self.seen.add(source)
+        entry = self.pages.get(source)
+        if entry is None or entry["output"] != dest or not os.path.exists(dest):
+            return True
+        inputs = [source, *dependencies]
+        if set(entry["inputs"]) != set(inputs):
+            return True
+        return any(entry["inputs"][path] != self.hash(path) for path in inputs)
+
+    def record(self, source: str, dest: str, dependencies=()):
+        """Record that source was rendered to dest using dependencies"""
+        self.seen.add(source)
+        self.pages[source] = {
+            "output": dest,
+            "inputs": {path: self.hash(path) for path in [source, *dependencies]},
+        }
+
+    def prune(self, logging=False):
+        """Delete outputs whose sources were not seen during this build"""
+        removed = []
+        for source in [s for s in self.pages if s not in self.seen]:
+            output = self.pages.pop(source)["output"]
+            if os.path.exists(output):
+                if logging:
+                    print(f"Removing: {output}")
+                os.remove(output)
+            removed.append(output)
+        return removed
+
+    def save(self):
+        """Write the manifest to disk atomically"""
+        save_json(
+            self.path,
+            {
+                "version": MANIFEST_VERSION,
+                "settings": self.settings,
+                "pages": self.pages,
+            },
+        )
@@ -0,0 +1,153 @@
+"""Module providing OutputWriter, which writes pages atomically and only if changed"""
+
+import json
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+
+UMASK = os.umask(0)
+os.umask(UMASK)
+
+
+@contextmanager
+def atomic_file(path: str, mode="wb", encoding=None, keep_old=None):
+    """Open a temp file next to path, renamed over path once the block is done
+
+    The temp file gets the permissions of a new file. It is removed instead
+    if the block raises, or if keep_old(tmp_path, path) is true once written
+    """
+    fd, tmp_path = tempfile.mkstemp(
+        dir=os.path.dirname(path) or ".", prefix=".", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, mode, encoding=encoding) as file:
+            os.chmod(tmp_path, 0o666 & ~UMASK)
+            yield file
+        if keep_old is not None and keep_old(tmp_path, path):
+            os.remove(tmp_path)
+        else:
+            os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def write_atomic(path: str, data: bytes):
+    """Write bytes to path through a temp file and rename"""
+    with atomic_file(path) as file:
+        file.write(data)
+
+
+def save_json(path: str, data):
+    """Write data to a JSON file atomically, creating its folder"""
+    parent_dir = os.path.dirname(path)
+    if parent_dir:
+        os.makedirs(parent_dir, exist_ok=True)
+    with atomic_file(path, "w", "utf-8") as file:
+        json.dump(data, file)
+
+
+def same_content(path: str, data: bytes):
+    """Check whether the file at path holds exactly data, if the sizes match"""
+    try:
+        if os.stat(path).st_size != len(data):
+            return False
+        with open(path, "rb") as file:
+            return file.read() == data
+    except FileNotFoundError:
+        return False
+
+
+def same_files(path: str, other: str):
+    """Check whether two files hold the same bytes, comparing them in chunks"""
+    try:
+        if os.stat(path).st_size != os.stat(other).st_size:
+            return False
+        with open(path, "rb") as first, open(other, "rb") as second:
+            while chunk := first.read(1 << 20):
+                if chunk != second.read(1 << 20):
+                    return False
+            return True
+    except FileNotFoundError:
+        return False
+
+
+class OutputWriter:
+    """Writes output files through a temp file and rename, skipping identical ones
+
+    Counts files written and skipped; safe to share between threads, and
+    picklable for worker processes, which report back with take_changes()
+    """
+
+    def __init__(self):
+        self.written = 0
+        self.skipped = 0
+        self._dirs = set()
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        return {"written": 0, "skipped": 0}
+
+    def __setstate__(self, state):
+        self.__init__()
+
+    def _count(self, written: bool):
+        with self._lock:
+            if written:
+                self.written += 1
+            else:
+                self.skipped += 1
+        return written
+
+    def _make_parent(self, path: str):
+        """Create the folder of path, once per folder"""
+        parent_dir = os.path.dirname(path)
+        if parent_dir not in self._dirs:
+            os.makedirs(parent_dir or ".", exist_ok=True)
+            self._dirs.add(parent_dir)
+        return parent_dir or "."
+
+    def _unchanged(self, tmp_path: str, path: str):
+        """Check whether a streamed temp file matches path, counting it"""
+        return not self._count(not same_files(tmp_path, path))
+
+    def write(self, path: str, text: str):
+        """Write text to path unless it already holds it; returns whether it wrote"""
+        data = text.encode("utf-8")
+        if same_content(path, data):
+            return self._count(False)
+        self._make_parent(path)
+        write_atomic(path, data)
+        return self._count(True)
+
+    @contextmanager
+    def open(self, path: str):
+        """Open a text file to stream output into, replacing path on success
+
+        For outputs too large to hold in memory: the temp file is compared
+        with path once written, and discarded if they are identical
+        """
+        self._make_parent(path)
+        with atomic_file(path, "w", "utf-8", keep_old=self._unchanged) as file:
+            yield file
+
+    def take_changes(self):
+        """Return and reset the files written and skipped since the last call"""
+        with self._lock:
+            changes = (self.written, self.skipped)
+            self.written = 0
+            self.skipped = 0
+        return changes
+
+    def merge(self, changes):
+        """Add counts reported by a worker's writer"""
+        written, skipped = changes
+        with self._lock:
+            self.written += written
+            self.skipped += skipped
+
+    def summary(self):
+        """Describe the files written and skipped"""
+        return f"Output: {self.written} written, {self.skipped} unchanged"
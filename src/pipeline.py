@@ -0,0 +1,113 @@
+"""Module providing an asyncio build pipeline overlapping reads, renders and writes"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from depgraph import DependencyGraph
+from document import page_values
+from images import ImageProcessor
+from output import OutputWriter
+from profiling import BuildProfiler, stage
+from rendercache import RenderCache
+from template import load_template
+
+PREFETCH = 16
+IO_WORKERS = 8
+
+
+def read_text(path: str):
+    """Read a markdown source"""
+    with open(path, encoding="utf-8") as file:
+        return file.read()
+
+
+async def build_pages_async(
+    pages,
+    template_path,
+    read_file=read_text,
+    write_file=None,
+    prefetch=PREFETCH,
+    io_workers=IO_WORKERS,
+    cache=None,
+    logging=True,
+    writer: OutputWriter = None,
+    graph: DependencyGraph = None,
+    images: ImageProcessor = None,
+    render_cache: RenderCache = None,
+    profiler: BuildProfiler = None,
+):
+    """Render (source, destination) pages, overlapping I/O with rendering
+
+    Reader tasks prefetch sources and writer tasks drain rendered pages on
+    a pool of io_workers * 2 threads. The queues between them hold at most
+    prefetch pages, so a slow volume neither stalls rendering nor lets
+    memory grow. Rendering runs on the event loop, as generate_page() does
+    it. Returns the (source, destination) pages rendered
+    """
+    if write_file is None:
+        write_file = (OutputWriter() if writer is None else writer).write
+    loop = asyncio.get_running_loop()
+    pending = iter(pages)
+    to_render = asyncio.Queue(prefetch)
+    to_write = asyncio.Queue(prefetch)
+    written = []
+
+    async def reader():
+        for source, dest in pending:
+            with stage(profiler, "read", source):
+                markdown = await loop.run_in_executor(io_pool, read_file, source)
+            await to_render.put((source, dest, markdown))
+        await to_render.put(None)
+
+    async def renderer():
+        finished_readers = 0
+        while finished_readers < io_workers:
+            item = await to_render.get()
+            if item is None:
+                finished_readers += 1
+                continue
+            source, dest, markdown = item
+            if logging:
+                print(f"Generating page from {source} to {dest} using {template_path}")
+            values = page_values(
+                markdown,
+                source,
+                dest,
+                template_path,
+                profiler,
+                cache,
+                render_cache,
+                graph,
+            )
+            with stage(profiler, "template fill", source):
+                html = load_template(template_path).render(values)
+                if images is not None:
+                    html = images.rewrite(html, dest)
+            await to_write.put((source, dest, html))
+        for _ in range(io_workers):
+            await to_write.put(None)
+
+    async def drain_writes():
+        while (item := await to_write.get()) is not None:
+            source, dest, html = item
+            with stage(profiler, "write", source):
+                await loop.run_in_executor(io_pool, write_file, dest, html)
+            written.append((source, dest))
+
+    with ThreadPoolExecutor(io_workers * 2) as io_pool:
+        tasks = [asyncio.ensure_future(reader()) for _ in range(io_workers)]
+        tasks.extend(asyncio.ensure_future(drain_writes()) for _ in range(io_workers))
+        tasks.append(asyncio.ensure_future(renderer()))
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+    return written
+
+
+def build_pages_pipelined(pages, template_path, **kwargs):
+    """Run build_pages_async() to completion, raising the first error it hit"""
+    return asyncio.run(build_pages_async(pages, template_path, **kwargs))
@@ -0,0 +1,90 @@
+"""Module providing BuildProfiler, wall time per build stage and per page"""
+
+import json
+import os
+import time
+from contextlib import contextmanager, nullcontext
+
+PAGE_STAGES = (
+    "read",
+    "block scan",
+    "inline parse",
+    "html serialization",
+    "template fill",
+    "write",
+)
+
+
+class BuildProfiler:
+    """Records wall time per stage, for each page and for the build as a whole"""
+
+    def __init__(self):
+        self.pages = {}
+        self.build = {}
+
+    @contextmanager
+    def stage(self, name: str, page: str = None):
+        """Time a stage of a page, or of the whole build if page is None"""
+        timings = self.build if page is None else self.pages.setdefault(page, {})
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            timings[name] = timings.get(name, 0.0) + time.perf_counter() - start
+
+    def add_page(self, page: str, timings: dict):
+        """Add the stage timings of a page profiled elsewhere, e.g. in a worker"""
+        self.pages[page] = timings
+
+    def stage_totals(self):
+        """Total time per page stage, across every page"""
+        totals = dict.fromkeys(PAGE_STAGES, 0.0)
+        for timings in self.pages.values():
+            for name, seconds in timings.items():
+                totals[name] = totals.get(name, 0.0) + seconds
+        return totals
+
+    def slowest(self, count=10):
+        """The slowest pages, as (page, seconds) pairs"""
+        totals = [(page, sum(timings.values())) for page, timings in self.pages.items()]
+        return sorted(totals, key=lambda total: total[1], reverse=True)[:count]
+
+    def to_dict(self):
+        """The profile as a JSON-serializable dictionary"""
+        return {
+            "build": self.build,
+            "stages": self.stage_totals(),
+            "pages": self.pages,
+        }
+
+    def write_json(self, path: str):
+        """Write the profile to a JSON file"""
+        parent_dir = os.path.dirname(path)
+        if parent_dir:
+            os.makedirs(parent_dir, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(self.to_dict(), file, indent=2, sort_keys=True)
+
+    def report(self, count=10):
+        """Human readable summary: build stages, page stages and slowest pages"""
+        lines = ["Build stages:"]
+        for name, seconds in self.build.items():
+            lines.append(f"  {name:<22}{seconds * 1000:10.1f} ms")
+        totals = self.stage_totals()
+        page_total = sum(totals.values()) or 1e-9
+        lines.append(f"Page stages ({len(self.pages)} pages):")
+        for name, seconds in totals.items():
+            lines.append(
+                f"  {name:<22}{seconds * 1000:10.1f} ms {seconds / page_total:7.1%}"
+            )
+        lines.append("Slowest pages:")
+        for page, seconds in self.slowest(count):
+            lines.append(f"  {seconds * 1000:10.1f} ms  {page}")
+        return "\n".join(lines)
+
+
+def stage(profiler: BuildProfiler, name: str, page: str = None):
+    """profiler.stage(name, page), or a no-op context if profiler is None"""
+    if profiler is None:
+        return nullcontext()
+    return profiler.stage(name, page)
@@ -0,0 +1,102 @@
+"""Module providing RenderCache, rendered page bodies stored on disk by content hash"""
+
+import hashlib
+import json
+import os
+
+from output import save_json
+from textnode import RENDERER_VERSION
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+class RenderCache:
+    """Content-addressed directory of rendered page bodies and titles
+
+    Entries are keyed on the markdown and the renderer version, so one
+    directory can be shared by many builds and CI runners. Entries are
+    written atomically, and evict() trims the least recently used ones
+    """
+
+    def __init__(self, directory: str, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def __getstate__(self):
+        # copies sent to worker processes start counting from zero
+        state = self.__dict__.copy()
+        state.update(hits=0, misses=0)
+        return state
+
+    @staticmethod
+    def key(markdown: str):
+        """Cache key of a markdown document"""
+        digest = hashlib.sha256(RENDERER_VERSION.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(markdown.encode("utf-8"))
+        return digest.hexdigest()
+
+    def entry_path(self, key: str):
+        """Path of the entry for key"""
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def get(self, key: str):
+        """Return (title, html) for key, or None on a miss"""
+        path = self.entry_path(key)
+        try:
+            with open(path, encoding="utf-8") as file:
+                entry = json.load(file)
+            os.utime(path)
+        except (FileNotFoundError, ValueError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry["title"], entry["html"]
+
+    def put(self, key: str, title: str, html: str):
+        """Store an entry atomically, so concurrent readers never see half of it"""
+        save_json(self.entry_path(key), {"title": title, "html": html})
+
+    def take_changes(self):
+        """Return and reset the hits and misses since the last call"""
+        changes = (self.hits, self.misses)
+        self.hits = 0
+        self.misses = 0
+        return changes
+
+    def merge(self, changes):
+        """Add hits and misses reported by take_changes()"""
+        self.hits += changes[0]
+        self.misses += changes[1]
+
+    def evict(self):
+        """Delete least recently used entries until the cache fits in max_bytes
+
+        Returns the number of entries deleted
+        """
+        entries = []
+        total = 0
+        if not os.path.isdir(self.directory):
+            return 0
+        with os.scandir(self.directory) as shards:
+            for shard in shards:
+                if not shard.is_dir():
+                    continue
+                with os.scandir(shard.path) as files:
+                    for entry in files:
+                        stat = entry.stat()
+                        entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+                        total += stat.st_size
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+        return removed
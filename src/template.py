@@ -0,0 +1,71 @@
+"""Module providing Template, a page template compiled once and cached"""
+
+import os
+import re
+
+PLACEHOLDER_PATTERN = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+
+_template_cache = {}
+
+
+class Template:
+    """Template compiled into literal segments separated by {{ var }} placeholders"""
+
+    def __init__(self, text: str):
+        self.segments = []
+        start = 0
+        for match in PLACEHOLDER_PATTERN.finditer(text):
+            self.segments.append(
+                (text[start : match.start()], match.group(1), match.group())
+            )
+            start = match.end()
+        self.tail = text[start:]
+
+    @property
+    def names(self):
+        """Names of the placeholders, in order of appearance"""
+        return [name for _, name, _ in self.segments]
+
+    def render_to(self, sink, values: dict):
+        """Write the template to a file-like sink, filling in placeholders
+
+        Values may be strings or HTMLNodes, which are streamed into the sink.
+        Placeholders without a value are left as they are
+        """
+        for literal, name, placeholder in self.segments:
+            sink.write(literal)
+            value = values.get(name)
+            if value is None:
+                sink.write(placeholder)
+            elif isinstance(value, str):
+                sink.write(value)
+            else:
+                value.write_html(sink)
+        sink.write(self.tail)
+
+    def render(self, values: dict):
+        """Return the filled in template as a string"""
+        parts = []
+        for literal, name, placeholder in self.segments:
+            parts.append(literal)
+            value = values.get(name)
+            if value is None:
+                parts.append(placeholder)
+            elif isinstance(value, str):
+                parts.append(value)
+            else:
+                parts.extend(value.iter_html())
+        parts.append(self.tail)
+        return "".join(parts)
+
+
+def load_template(path: str):
+    """Load a compiled template, reparsing only if the file changed"""
+    stat = os.stat(path)
+    key = (stat.st_mtime_ns, stat.st_size)
+    cached = _template_cache.get(path)
+    if cached is None or cached[0] != key:
+        with open(path, encoding="utf-8") as file:
+            cached = (key, Template(file.read()))
+        _template_cache[path] = cached
+    return cached[1]
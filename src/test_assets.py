@@ -0,0 +1,130 @@
+"""testing static asset syncing"""
+
+import os
+import tempfile
+import unittest
+
+from assets import copy_files, place_file, scan_files, sync_assets, throughput
+from fixtures import TempDirMixin
+
+
+class TestSyncAssets(TempDirMixin, unittest.TestCase):
+    """Test sync_assets()"""
+
+    def setUp(self):
+        super().setUp()
+        self.static = self.tmp_path("static")
+        self.public = self.tmp_path("public")
+        self.write("static/index.css", "body {}")
+        self.write("static/images/logo.svg", "<svg/>")
+
+    def read(self, name):
+        """Read a file from the temporary directory"""
+        with open(self.tmp_path(name), encoding="utf-8") as file:
+            return file.read()
+
+    def test_first_sync_copies_everything(self):
+        """Test syncing into an empty destination"""
+        stats = sync_assets(self.static, self.public)
+        self.assertEqual(stats, {"copied": 2, "skipped": 0, "removed": 0})
+        self.assertEqual(self.read("public/images/logo.svg"), "<svg/>")
+
+    def test_unchanged_sync_copies_nothing(self):
+        """Test a second sync skips every file"""
+        sync_assets(self.static, self.public)
+        stats = sync_assets(self.static, self.public)
+        self.assertEqual(stats, {"copied": 0, "skipped": 2, "removed": 0})
+
+    def test_changed_file_is_copied(self):
+        """Test a changed file is copied again"""
+        sync_assets(self.static, self.public)
+        self.write("static/index.css", "body { margin: 0 }")
+        stats = sync_assets(self.static, self.public)
+        self.assertEqual(stats["copied"], 1)
+        self.assertEqual(self.read("public/index.css"), "body { margin: 0 }")
+
+    def test_hash_comparison(self):
+        """Test use_hash spots same-size edits even with identical mtimes"""
+        sync_assets(self.static, self.public)
+        self.write("public/index.css", "body []")
+        source_stat = os.stat(self.tmp_path("static/index.css"))
+        os.utime(self.tmp_path("public/index.css"), ns=(0, source_stat.st_mtime_ns))
+        self.assertEqual(sync_assets(self.static, self.public)["copied"], 0)
+        self.assertEqual(
+            sync_assets(self.static, self.public, use_hash=True)["copied"], 1
+        )
+        self.assertEqual(self.read("public/index.css"), "body {}")
+
+    def test_stale_files_removed_and_kept(self):
+        """Test files missing from the source are removed unless kept"""
+        sync_assets(self.static, self.public)
+        page = self.write("public/blog/index.html", "<p>page</p>")
+        os.remove(self.tmp_path("static/images/logo.svg"))
+        stats = sync_assets(self.static, self.public, keep={page}.__contains__)
+        self.assertEqual(stats["removed"], 1)
+        self.assertFalse(os.path.exists(self.tmp_path("public/images/logo.svg")))
+        self.assertTrue(os.path.exists(page))
+
+    def test_hardlink(self):
+        """Test hardlinked files share an inode with the source"""
+        sync_assets(self.static, self.public, link="hardlink")
+        self.assertTrue(
+            os.path.samefile(
+                self.tmp_path("static/index.css"), self.tmp_path("public/index.css")
+            )
+        )
+        stats = sync_assets(self.static, self.public, link="hardlink")
+        self.assertEqual(stats["copied"], 0)
+
+    def test_reflink_falls_back_to_copy(self):
+        """Test reflinks fall back to a copy where unsupported"""
+        dest = self.tmp_path("copy.css")
+        place_file(self.tmp_path("static/index.css"), dest, link="reflink")
+        self.assertEqual(self.read("copy.css"), "body {}")
+
+    def test_bad_link_mode(self):
+        """Test an unknown link mode"""
+        with self.assertRaises(ValueError):
+            place_file(
+                self.tmp_path("static/index.css"), self.tmp_path("x"), link="symlink"
+            )
+
+
+class TestCopyFiles(unittest.TestCase):
+    """Test scan_files() and copy_files()"""
+
+    def test_scan_and_copy(self):
+        """Test a threaded copy of a scanned tree"""
+        with tempfile.TemporaryDirectory() as tmp:
+            for n in range(20):
+                path = os.path.join(tmp, "static", f"dir{n % 3}", f"file{n}.txt")
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, "w", encoding="utf-8") as file:
+                    file.write(f"{n:04}")
+            files = scan_files(os.path.join(tmp, "static"), os.path.join(tmp, "out"))
+            self.assertEqual(len(files), 20)
+            self.assertIn(
+                (
+                    os.path.join(tmp, "static", "dir1", "file4.txt"),
+                    os.path.join(tmp, "out", "dir1", "file4.txt"),
+                    4,
+                ),
+                files,
+            )
+            stats = copy_files(files, threads=4)
+            self.assertEqual((stats["files"], stats["bytes"]), (20, 80))
+            with open(
+                os.path.join(tmp, "out", "dir1", "file4.txt"), encoding="utf-8"
+            ) as file:
+                self.assertEqual(file.read(), "0004")
+
+    def test_throughput(self):
+        """Test the throughput summary"""
+        self.assertEqual(
+            throughput({"files": 100, "bytes": 4_000_000, "seconds": 2.0}),
+            "100 files, 4.0 MB in 2.00 s (50 files/s, 2.0 MB/s)",
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
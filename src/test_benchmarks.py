@@ -0,0 +1,31 @@
+"""testing the benchmark corpora and regression check"""
+
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+from benchmarks import CORPORA, make_corpus, print_results
+from textnode import markdown_to_html_node
+
+
+class TestBenchmarks(unittest.TestCase):
+    """Test benchmark helpers"""
+
+    def test_corpora_render(self):
+        """Test every corpus shape is reproducible and renders"""
+        for shape in CORPORA:
+            markdown = make_corpus(shape, 4)
+            self.assertEqual(markdown, make_corpus(shape, 4))
+            self.assertTrue(markdown_to_html_node(markdown).to_html())
+
+    def test_print_results_regressions(self):
+        """Test slowdowns beyond the threshold are reported"""
+        with redirect_stdout(StringIO()):
+            regressions = print_results(
+                {"a": 2.0, "b": 1.0, "c": 1.0}, {"a": 1.0, "b": 1.0}, threshold=1.5
+            )
+        self.assertEqual(regressions, ["a"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+"""testing the rendered block cache"""
+
+import os
+import pickle
+import tempfile
+import unittest
+
+from blockcache import BlockCache
+from textnode import markdown_to_html_node
+
+
+class TestBlockCache(unittest.TestCase):
+    """Test BlockCache"""
+
+    def test_render_hit_and_miss(self):
+        """Test a block is rendered once and then served from the cache"""
+        calls = []
+        cache = BlockCache()
+
+        def render(block):
+            calls.append(block)
+            return f"<p>{block}</p>"
+
+        self.assertEqual(cache.render("text", render), "<p>text</p>")
+        self.assertEqual(cache.render("text", render), "<p>text</p>")
+        self.assertEqual(calls, ["text"])
+        self.assertEqual(
+            cache.stats(), {"hits": 1, "misses": 1, "entries": 1, "hit_rate": 0.5}
+        )
+
+    def test_lru_eviction(self):
+        """Test the least recently used block is evicted first"""
+        cache = BlockCache(max_entries=2)
+        cache.render("a", str.upper)
+        cache.render("b", str.upper)
+        cache.render("a", str.upper)
+        cache.render("c", str.upper)
+        self.assertEqual(cache.stats()["entries"], 2)
+        cache.render("a", str.upper)
+        self.assertEqual(cache.hits, 2)
+        cache.render("b", str.upper)
+        self.assertEqual(cache.misses, 4)
+
+    def test_markdown_to_html_node_cached(self):
+        """Test cached rendering produces the same HTML"""
+        markdown = "# Title\n\nSome **text**\n\n* a\n* b\n\nSome **text**"
+        cache = BlockCache()
+        expected = markdown_to_html_node(markdown).to_html()
+        self.assertEqual(markdown_to_html_node(markdown, cache).to_html(), expected)
+        self.assertEqual(markdown_to_html_node(markdown, cache).to_html(), expected)
+        self.assertEqual((cache.hits, cache.misses), (5, 3))
+
+    def test_persisted(self):
+        """Test a saved cache is reloaded by the next build"""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "cache", "blocks.json")
+            cache = BlockCache(path=path)
+            cache.render("text", str.upper)
+            cache.save()
+            reloaded = BlockCache(path=path)
+            self.assertEqual(reloaded.render("text", str.lower), "TEXT")
+            self.assertEqual(reloaded.hits, 1)
+
+    def test_worker_changes_merge(self):
+        """Test a worker's copy reports its hits, misses and entries back"""
+        cache = BlockCache()
+        cache.render("a", str.upper)
+        worker_copy = pickle.loads(pickle.dumps(cache))
+        self.assertEqual((worker_copy.hits, worker_copy.misses), (0, 0))
+        worker_copy.render("a", str.upper)
+        worker_copy.render("b", str.upper)
+        cache.merge(worker_copy.take_changes())
+        self.assertEqual((cache.hits, cache.misses), (1, 2))
+        self.assertEqual(cache.render("b", str.lower), "B")
+
+
+if __name__ == "__main__":
+    unittest.main()
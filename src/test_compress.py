@@ -0,0 +1,71 @@
+"""testing the compression stage"""
+
+import gzip
+import os
+import unittest
+
+from compress import compress_outputs, is_sibling, is_up_to_date
+from fixtures import TempDirMixin
+from output import UMASK
+
+
+class TestCompressOutputs(TempDirMixin, unittest.TestCase):
+    """Test compress_outputs"""
+
+    def setUp(self):
+        super().setUp()
+        self.dest = self.tmp.name
+        self.page = self.write("blog/index.html", "<p>hello</p>" * 100)
+        self.css = self.write("index.css", "body { margin: 0; }")
+        self.write("images/logo.png", "not text")
+
+    def test_writes_gzip_siblings(self):
+        """Test HTML and CSS outputs get a .gz sibling holding their content"""
+        stats = compress_outputs(self.dest, threads=2)
+        self.assertEqual((stats["compressed"], stats["skipped"]), (2, 0))
+        for path in (self.page, self.css):
+            with open(path, "rb") as source, gzip.open(f"{path}.gz") as sibling:
+                self.assertEqual(sibling.read(), source.read())
+            self.assertTrue(is_up_to_date(path, f"{path}.gz"))
+            self.assertEqual(os.stat(f"{path}.gz").st_mode & 0o777, 0o666 & ~UMASK)
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "images/logo.png.gz")))
+        leftovers = [name for name in os.listdir(self.dest) if name.endswith(".tmp")]
+        self.assertEqual(leftovers, [])
+
+    def test_skips_up_to_date(self):
+        """Test a second run only recompresses outputs that changed"""
+        compress_outputs(self.dest)
+        with open(f"{self.css}.gz", "rb") as file:
+            before = file.read()
+        os.utime(self.page, ns=(0, 0))
+        stats = compress_outputs(self.dest)
+        self.assertEqual((stats["compressed"], stats["skipped"]), (1, 1))
+        with open(f"{self.css}.gz", "rb") as file:
+            self.assertEqual(file.read(), before)
+
+    def test_removes_orphans(self):
+        """Test siblings of outputs that are gone are removed"""
+        compress_outputs(self.dest)
+        os.remove(self.page)
+        stats = compress_outputs(self.dest)
+        self.assertEqual(stats["removed"], 1)
+        self.assertFalse(os.path.exists(f"{self.page}.gz"))
+        self.assertTrue(os.path.exists(f"{self.css}.gz"))
+
+    def test_custom_encoders(self):
+        """Test each encoder writes its own sibling"""
+        encoders = {".gz": gzip.compress, ".br": lambda data: data[::-1]}
+        compress_outputs(self.dest, encoders=encoders)
+        with open(f"{self.css}.br", "rb") as file:
+            self.assertEqual(file.read(), b"body { margin: 0; }"[::-1])
+
+    def test_is_sibling(self):
+        """Test only compressed copies of HTML and CSS count as siblings"""
+        self.assertTrue(is_sibling("public/index.html.gz"))
+        self.assertTrue(is_sibling("public/index.css.br"))
+        self.assertFalse(is_sibling("public/archive.tar.gz"))
+        self.assertFalse(is_sibling("public/index.html"))
+
+
+if __name__ == "__main__":
+    unittest.main()
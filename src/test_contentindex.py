@@ -0,0 +1,92 @@
+"""testing the persistent content index"""
+
+import os
+import time
+import unittest
+
+from contentindex import ContentIndex
+from fixtures import TempDirMixin
+
+
+class TestContentIndex(TempDirMixin, unittest.TestCase):
+    """Test ContentIndex"""
+
+    def setUp(self):
+        super().setUp()
+        self.root = os.path.join(self.tmp.name, "content")
+        self.path = os.path.join(self.tmp.name, "cache", "index.json")
+        self.write("index.md", "# Home")
+        self.write("blog/b.md", "# B")
+        self.write("blog/a.md", "# A")
+        self.write("blog.md", "# Blog")
+
+    def write(self, name, data, mtime=None):
+        """Write a file under the content root"""
+        return super().write(os.path.join("content", name), data, mtime)
+
+    def backdate(self):
+        """Move every directory's mtime out of the racy window"""
+        past = time.time() - 3600
+        for dir_path, _, _ in os.walk(self.root):
+            os.utime(dir_path, (past, past))
+
+    def saved_index(self):
+        """Scan and save an index of the backdated tree, and load it back"""
+        self.backdate()
+        index = ContentIndex(self.path)
+        index.scan(self.root)
+        index.save()
+        return ContentIndex(self.path)
+
+    def test_scan_sorted(self):
+        """Test scan() lists files in the order of a sorted recursive walk"""
+        files = ContentIndex().scan(self.root)
+        self.assertEqual(
+            [os.path.relpath(path, self.root) for path, _, _ in files],
+            ["blog/a.md", "blog/b.md", "blog.md", "index.md"],
+        )
+        self.assertEqual(files[-1][1], len("# Home"))
+
+    def test_unchanged_directories_reused(self):
+        """Test a saved index rescans nothing when no directory changed"""
+        index = self.saved_index()
+        index.scan(self.root)
+        self.assertEqual((index.reused, index.rescanned), (2, 0))
+
+    def test_recent_directories_rescanned(self):
+        """Test directories modified within the racy window are not trusted"""
+        index = ContentIndex(self.path)
+        index.scan(self.root)
+        index.save()
+        index = ContentIndex(self.path)
+        index.scan(self.root)
+        self.assertEqual(index.rescanned, 2)
+
+    def test_added_file_found(self):
+        """Test only the directory with a new file is rescanned"""
+        index = self.saved_index()
+        self.write("blog/c.md", "# C")
+        files = index.scan(self.root)
+        self.assertIn(os.path.join(self.root, "blog", "c.md"), [f[0] for f in files])
+        self.assertEqual((index.reused, index.rescanned), (1, 1))
+
+    def test_removed_directory_dropped(self):
+        """Test a deleted directory is dropped from the index"""
+        index = self.saved_index()
+        for name in ["a.md", "b.md"]:
+            os.remove(os.path.join(self.root, "blog", name))
+        os.rmdir(os.path.join(self.root, "blog"))
+        files = index.scan(self.root)
+        self.assertEqual(len(files), 2)
+        self.assertNotIn(os.path.join(self.root, "blog"), index.dirs)
+
+    def test_version_mismatch_ignored(self):
+        """Test an index written by another version is discarded"""
+        self.saved_index()
+        with open(self.path, "w", encoding="utf-8") as file:
+            file.write('{"version": 0, "dirs": {}}')
+        self.assertEqual(ContentIndex(self.path).dirs, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,132 @@
+"""testing the build dependency graph"""
+
+import os
+import pickle
+import tempfile
+import unittest
+
+from depgraph import DependencyGraph
+
+
+class TestDependencyGraph(unittest.TestCase):
+    """Test DependencyGraph"""
+
+    def setUp(self):
+        self.graph = DependencyGraph()
+        self.graph.record(
+            "content/index.md",
+            "public/index.html",
+            "template.html",
+            links=["/blog", "https://example.com", "#top"],
+            images=["/images/logo.png"],
+        )
+        self.graph.record(
+            "content/blog/index.md",
+            "public/blog/index.html",
+            "template.html",
+            links=["post.html", "/"],
+        )
+
+    def test_url_targets(self):
+        """Test URLs resolve to every content or static file they may name"""
+        targets = self.graph.url_targets
+        source = "content/blog/post.md"
+        self.assertEqual(targets("/", source), ["content/index.md"])
+        self.assertEqual(
+            targets("/a?x=1#b", source), ["content/a.md", "content/a/index.md"]
+        )
+        self.assertEqual(targets("other.html", source), ["content/blog/other.md"])
+        self.assertEqual(
+            targets("/doc.pdf", source), ["content/doc.pdf", "static/doc.pdf"]
+        )
+        self.assertEqual(targets("../x.png", source, True), ["static/x.png"])
+        self.assertEqual(targets("../../etc/passwd", source), [])
+        self.assertEqual(targets("mailto:me@example.com", source), [])
+
+    def test_dependencies(self):
+        """Test the edges recorded for a page"""
+        self.assertEqual(
+            self.graph.dependencies("content/index.md"),
+            {
+                "template": ["template.html"],
+                "link": ["content/blog.md", "content/blog/index.md"],
+                "image": ["static/images/logo.png"],
+            },
+        )
+
+    def test_dependents(self):
+        """Test the reverse edges of a file"""
+        self.assertEqual(
+            self.graph.dependents("template.html"),
+            [
+                ("content/blog/index.md", "template"),
+                ("content/index.md", "template"),
+            ],
+        )
+
+    def test_affected_template(self):
+        """Test a template change rebuilds every page using it"""
+        self.assertEqual(len(self.graph.affected(["template.html"])), 2)
+
+    def test_affected_image(self):
+        """Test an image change rebuilds only the pages showing it"""
+        self.assertEqual(
+            self.graph.affected(["static/images/logo.png"]),
+            [("content/index.md", "public/index.html")],
+        )
+
+    def test_affected_edited_page(self):
+        """Test editing a page rebuilds it but not the pages linking to it"""
+        self.assertEqual(
+            self.graph.affected(["content/blog/index.md"]),
+            [("content/blog/index.md", "public/blog/index.html")],
+        )
+
+    def test_affected_added_and_removed_pages(self):
+        """Test adding or removing a linked page rebuilds the pages linking to it"""
+        self.assertEqual(
+            self.graph.affected(["content/blog/post.md"]),
+            [("content/blog/index.md", "public/blog/index.html")],
+        )
+        self.assertEqual(
+            self.graph.prune(["content/blog/index.md"]), ["content/index.md"]
+        )
+        self.assertEqual(
+            self.graph.affected(["content/index.md"]),
+            [("content/blog/index.md", "public/blog/index.html")],
+        )
+
+    def test_inputs(self):
+        """Test the hashed inputs of a page are its template and images"""
+        self.assertEqual(
+            self.graph.inputs("content/index.md", "template.html"),
+            ["template.html", "static/images/logo.png"],
+        )
+        self.assertEqual(self.graph.inputs("content/new.md", "t.html"), ["t.html"])
+
+    def test_worker_changes(self):
+        """Test a pickled graph reports only what it recorded back"""
+        worker = pickle.loads(pickle.dumps(self.graph))
+        self.assertEqual(worker.pages, {})
+        worker.record("content/new.md", "public/new.html", "template.html", ["/"])
+        self.graph.merge(worker.take_changes())
+        self.assertEqual(
+            self.graph.dependents("content/index.md"),
+            [("content/blog/index.md", "link"), ("content/new.md", "link")],
+        )
+
+    def test_save_and_load(self):
+        """Test the graph round-trips through its file"""
+        with tempfile.TemporaryDirectory() as tmp:
+            self.graph.path = os.path.join(tmp, "cache", "deps.json")
+            self.graph.save()
+            loaded = DependencyGraph(self.graph.path)
+        self.assertEqual(loaded.pages, self.graph.pages)
+        self.assertIn(
+            "  needed by (link): content/index.md",
+            loaded.describe("content/blog/index.md"),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+"""testing the parsed Document"""
+
+import os
+import tempfile
+import unittest
+
+from blockcache import BlockCache
+from document import Document
+from htmlnode import LeafNode
+from textnode import BlockType, markdown_to_html_node
+
+MARKDOWN = "Intro\n\n# Title\n\n## Sub\n\n* a\n* b"
+
+
+class TestDocument(unittest.TestCase):
+    """Test Document"""
+
+    def test_blocks(self):
+        """Test the document holds classified blocks"""
+        self.assertEqual(
+            Document(MARKDOWN).blocks,
+            [
+                (BlockType.PARAGRAPH, "Intro"),
+                (BlockType.HEADING, "# Title"),
+                (BlockType.HEADING, "## Sub"),
+                (BlockType.UNORDERED_LIST, "* a\n* b"),
+            ],
+        )
+
+    def test_references(self):
+        """Test links and images are collected, skipping code blocks"""
+        document = Document(
+            "# T\n\n[a](/a) and ![img](/i.png)\n\n```\n[not](/code)\n```\n\n* [b](b)"
+        )
+        self.assertEqual(document.references, (["/a", "b"], ["/i.png"]))
+
+    def test_references_match_rendering(self):
+        """Test inline code is not a link and a linked badge is an image"""
+        document = Document("# T\n\n`[text](missing-page)` and [![b](/img/b.svg)](/about)")
+        self.assertEqual(document.references, ([], ["/img/b.svg"]))
+        self.assertIn('<img src="/img/b.svg"', document.html_node().to_html())
+
+    def test_title(self):
+        """Test the title is the first h1"""
+        self.assertEqual(Document(MARKDOWN).title, "Title")
+
+    def test_title_missing(self):
+        """Test a document without an h1"""
+        with self.assertRaises(ValueError) as ve:
+            _ = Document("## Sub\n\ntext").title
+        self.assertEqual(str(ve.exception), "Markdown requires h1 tag")
+
+    def test_html_node(self):
+        """Test the body matches markdown_to_html_node()"""
+        self.assertEqual(
+            Document(MARKDOWN).html_node().to_html(),
+            markdown_to_html_node(MARKDOWN).to_html(),
+        )
+
+    def test_template_values(self):
+        """Test the values handed to the template"""
+        values = Document(MARKDOWN, "content/index.md").template_values()
+        self.assertEqual(values["Title"], "Title")
+        self.assertEqual(values["Source"], "content/index.md")
+        self.assertTrue(values["Content"].to_html().startswith("<div><p>Intro</p>"))
+
+    def test_from_file(self):
+        """Test reading a document from disk"""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "page.md")
+            with open(path, "w", encoding="utf-8") as file:
+                file.write(MARKDOWN)
+            document = Document.from_file(path)
+        self.assertEqual(document.source, path)
+        self.assertEqual(document.title, "Title")
+
+    def test_html_node_cached(self):
+        """Test rendering through a block cache"""
+        cache = BlockCache()
+        document = Document(MARKDOWN)
+        expected = document.html_node().to_html()
+        self.assertEqual(document.html_node(cache).to_html(), expected)
+        body = document.html_node(cache)
+        self.assertTrue(all(isinstance(c, LeafNode) for c in body.children))
+        self.assertEqual(body.to_html(), expected)
+        self.assertEqual((cache.hits, cache.misses), (4, 4))
+
+
+if __name__ == "__main__":
+    unittest.main()
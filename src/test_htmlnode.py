@@ -1,6 +1,7 @@
 """testing HTML Node"""
 
 import unittest
+from io import StringIO
 
 from htmlnode import HTMLNode, LeafNode, ParentNode
 
@@ -16,6 +17,11 @@ class TestHTMLNode(unittest.TestCase):
         self.assertEqual(node.children, None)
         self.assertEqual(node.props, None)
 
+    def test_no_instance_dict(self):
+        """Test nodes use __slots__ rather than a per-instance __dict__"""
+        for node in (HTMLNode("p"), LeafNode("b", "x"), ParentNode("p", [])):
+            self.assertFalse(hasattr(node, "__dict__"))
+
     def test_props_to_html(self):
         """Test props_to_html()"""
         node = HTMLNode(props={"href": "https://www.google.com", "target": "_blank"})
@@ -107,6 +113,41 @@ class TestHTMLNode(unittest.TestCase):
         self.assertEqual(top.tag, "h1")
         self.assertEqual(top.to_html(), "<h1><p><b>leaf</b></p></h1>")
 
+    def test_parent_iter_html(self):
+        """Test iter_html() yields the same HTML as to_html() in chunks"""
+        top = ParentNode(
+            "div",
+            [
+                ParentNode("p", [LeafNode(None, "a"), LeafNode("b", "b")]),
+                LeafNode("i", "c"),
+            ],
+        )
+        chunks = list(top.iter_html())
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual("".join(chunks), "<div><p>a<b>b</b></p><i>c</i></div>")
+
+    def test_parent_write_html(self):
+        """Test write_html() writes to a file-like sink"""
+        sink = StringIO()
+        ParentNode("p", [LeafNode("b", "test")]).write_html(sink)
+        self.assertEqual(sink.getvalue(), "<p><b>test</b></p>")
+
+    def test_parent_deeply_nested(self):
+        """Test serializing a tree deeper than the recursion limit"""
+        node = LeafNode(None, "leaf")
+        for _ in range(5000):
+            node = ParentNode("span", [node])
+        html = node.to_html()
+        self.assertTrue(html.startswith("<span><span>"))
+        self.assertEqual(len(html), 5000 * len("<span></span>") + len("leaf"))
+
+    def test_parent_nested_no_children(self):
+        """Test a nested parent without children raises while streaming"""
+        top = ParentNode("div", [ParentNode("p", [])])
+        with self.assertRaises(ValueError) as ve:
+            top.to_html()
+        self.assertEqual(str(ve.exception), "Missing children")
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,196 @@
+"""testing image sizing and downscaling"""
+
+import os
+import pickle
+import struct
+import unittest
+import zlib
+
+from fixtures import TempDirMixin
+from images import (
+    ImageProcessor,
+    downscale,
+    encode_png,
+    image_size,
+    is_variant,
+    paeth,
+    png_chunk,
+    read_png,
+)
+
+
+def gradient(width, height, channels=3):
+    """Rows of a simple test image"""
+    return [
+        bytearray(
+            (x * 7 + y * 13 + c * 50) % 256
+            for x in range(width)
+            for c in range(channels)
+        )
+        for y in range(height)
+    ]
+
+
+def filtered_png(width, height, rows, kinds):
+    """A 3-channel PNG whose scanlines use the given filter types in turn"""
+    raw = b""
+    previous = bytearray(width * 3)
+    for y, row in enumerate(rows):
+        kind = kinds[y % len(kinds)]
+        out = bytearray(len(row))
+        for i, value in enumerate(row):
+            left = row[i - 3] if i >= 3 else 0
+            up = previous[i]
+            up_left = previous[i - 3] if i >= 3 else 0
+            predicted = [0, left, up, (left + up) >> 1, paeth(left, up, up_left)][kind]
+            out[i] = (value - predicted) & 0xFF
+        raw += bytes([kind]) + out
+        previous = row
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return b"".join(
+        [
+            b"\x89PNG\r\n\x1a\n",
+            png_chunk(b"IHDR", header),
+            png_chunk(b"IDAT", zlib.compress(raw)),
+            png_chunk(b"IEND", b""),
+        ]
+    )
+
+
+def jpeg_header(width, height):
+    """The first segments of a baseline JPEG, up to its frame header"""
+    app0 = b"JFIF\x00\x01\x01\x00\x00\x01\x00\x01\x00\x00"
+    return (
+        b"\xff\xd8"
+        + b"\xff\xe0"
+        + struct.pack(">H", len(app0) + 2)
+        + app0
+        + b"\xff\xc0"
+        + struct.pack(">HBHHB", 11, 8, height, width, 1)
+        + b"\x01\x11\x00"
+    )
+
+
+class TestImageFormats(TempDirMixin, unittest.TestCase):
+    """Test reading and writing images"""
+
+    def test_image_size(self):
+        """Test PNG and JPEG dimensions are read from their headers"""
+        png = self.write("a.png", encode_png(5, 3, 3, gradient(5, 3)))
+        jpeg = self.write("b.jpg", jpeg_header(640, 480))
+        text = self.write("c.txt", b"not an image")
+        self.assertEqual(image_size(png), (5, 3))
+        self.assertEqual(image_size(jpeg), (640, 480))
+        self.assertIsNone(image_size(text))
+        self.assertIsNone(image_size(os.path.join(self.tmp.name, "missing.png")))
+
+    def test_read_png_filters(self):
+        """Test scanlines with every filter type decode to the original pixels"""
+        rows = gradient(6, 5)
+        path = self.write("f.png", filtered_png(6, 5, rows, [0, 1, 2, 3, 4]))
+        self.assertEqual(read_png(path), (6, 5, 3, rows))
+
+    def test_read_png_unsupported(self):
+        """Test palette PNGs are not decoded"""
+        header = struct.pack(">IIBBBBB", 1, 1, 8, 3, 0, 0, 0)
+        path = self.write("p.png", b"\x89PNG\r\n\x1a\n" + png_chunk(b"IHDR", header))
+        self.assertIsNone(read_png(path))
+
+    def test_downscale(self):
+        """Test downscaling averages boxes and drops partial edge boxes"""
+        rows = [bytearray([0, 10, 20, 30, 99]), bytearray([40, 50, 60, 70, 99])]
+        self.assertEqual(downscale(5, 2, 1, rows, 2), (2, 1, [bytearray([25, 45])]))
+
+    def test_is_variant(self):
+        """Test downscaled copies are recognised by name"""
+        self.assertTrue(is_variant("public/images/a.640w.png"))
+        self.assertFalse(is_variant("public/images/a.png"))
+
+
+class TestImageProcessor(TempDirMixin, unittest.TestCase):
+    """Test ImageProcessor"""
+
+    def setUp(self):
+        super().setUp()
+        self.static = os.path.join(self.tmp.name, "static")
+        self.public = os.path.join(self.tmp.name, "public")
+        self.cache = os.path.join(self.tmp.name, "cache")
+        self.write("static/images/big.png", encode_png(40, 20, 4, gradient(40, 20, 4)))
+        self.write("static/small.jpg", jpeg_header(30, 10))
+        self.page = os.path.join(self.public, "blog", "index.html")
+
+    def processor(self, max_width=None):
+        """An ImageProcessor for the temporary site"""
+        return ImageProcessor(self.static, self.public, self.cache, max_width)
+
+    def test_rewrite_sizes(self):
+        """Test img tags get the size of the image their src points at"""
+        html = self.processor().rewrite(
+            '<p><img src="/images/big.png" alt="a"></img>'
+            '<img src="../small.jpg" alt="b"></img>'
+            '<img src="/missing.png" alt="c"></img>'
+            '<img src="https://example.com/x.png" alt="d"></img></p>',
+            self.page,
+        )
+        self.assertEqual(
+            html,
+            '<p><img src="/images/big.png" alt="a" width="40" height="20"></img>'
+            '<img src="../small.jpg" alt="b" width="30" height="10"></img>'
+            '<img src="/missing.png" alt="c"></img>'
+            '<img src="https://example.com/x.png" alt="d"></img></p>',
+        )
+
+    def test_rewrite_variant(self):
+        """Test wide PNGs point at a downscaled copy, made once and reused"""
+        tag = '<img src="/images/big.png" alt="a">'
+        processor = self.processor(max_width=15)
+        self.assertEqual(
+            processor.rewrite(tag, self.page),
+            '<img src="/images/big.13w.png" alt="a" width="13" height="6">',
+        )
+        variant = os.path.join(self.public, "images", "big.13w.png")
+        self.assertEqual(image_size(variant), (13, 6))
+        again = pickle.loads(pickle.dumps(processor))
+        again.rewrite(tag, self.page)
+        processor.merge(again.take_changes())
+        self.assertEqual((processor.created, processor.reused), (1, 1))
+        self.assertEqual(len(os.listdir(self.cache)), 1)
+
+    def test_rewrite_variant_edited_in_place(self):
+        """Test editing an image without changing its size replaces its copy"""
+        tag = '<img src="/images/big.png" alt="a">'
+        processor = self.processor(max_width=15)
+        processor.rewrite(tag, self.page)
+        variant = os.path.join(self.public, "images", "big.13w.png")
+        with open(variant, "rb") as file:
+            before = file.read()
+        self.write(
+            "static/images/big.png",
+            encode_png(40, 20, 4, gradient(40, 20, 4)[::-1]),
+            mtime=1,
+        )
+        processor.rewrite(tag, self.page)
+        with open(variant, "rb") as file:
+            self.assertNotEqual(file.read(), before)
+        self.assertEqual(processor.created, 2)
+
+    def test_rewrite_narrow_and_jpeg_not_scaled(self):
+        """Test images within max_width, and JPEGs, keep their src"""
+        html = self.processor(max_width=35).rewrite(
+            '<img src="/small.jpg" alt="b">', self.page
+        )
+        self.assertEqual(html, '<img src="/small.jpg" alt="b" width="30" height="10">')
+
+    def test_rewrite_corrupt_png_sized_only(self):
+        """Test a PNG that cannot be decoded keeps its src and gets its size"""
+        png = encode_png(40, 20, 3, gradient(40, 20))
+        idat = png.index(b"IDAT") + 4
+        self.write("static/bad.png", png[:idat] + b"\x00" * 8 + png[idat + 8 :])
+        html = self.processor(max_width=15).rewrite(
+            '<img src="/bad.png" alt="x">', self.page
+        )
+        self.assertEqual(html, '<img src="/bad.png" alt="x" width="40" height="20">')
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+"""testing the site-wide link index"""
+
+import json
+import os
+import tempfile
+import unittest
+
+from depgraph import DependencyGraph
+from linkindex import LinkIndex
+
+
+class TestLinkIndex(unittest.TestCase):
+    """Test LinkIndex"""
+
+    def setUp(self):
+        self.index = LinkIndex("public")
+        self.index.add_page(
+            "content/index.md",
+            "public/index.html",
+            links=["/blog", "blog/", "/missing", "#top", "https://example.com"],
+            images=["/images/logo.png", "images/gone.png"],
+        )
+        self.index.add_page(
+            "content/blog/index.md",
+            os.path.join("public", "blog", "index.html"),
+            links=["../", "post", "post.html"],
+        )
+        self.index.add_page("content/blog/post.md", "public/blog/post.html")
+        self.index.add_target("public/images/logo.png")
+
+    def test_site_path(self):
+        """Test outputs map to URL paths from the site root"""
+        self.assertEqual(
+            self.index.site_path(os.path.join("public", "a", "b.html")), "/a/b.html"
+        )
+
+    def test_resolve(self):
+        """Test relative URLs resolve against the page, external ones are skipped"""
+        self.assertEqual(self.index.resolve("../x%20y", "/blog/index.html"), "/x y")
+        self.assertEqual(self.index.resolve("/a?q=1#b", "/index.html"), "/a")
+        self.assertIsNone(self.index.resolve("#top", "/index.html"))
+        self.assertIsNone(self.index.resolve("//cdn.example.com/a.js", "/"))
+
+    def test_exists(self):
+        """Test pages are found by their file, folder or extensionless path"""
+        for path in ["/", "/index.html", "/blog", "/blog/", "/blog/post"]:
+            self.assertTrue(self.index.exists(path), path)
+        self.assertFalse(self.index.exists("/post"))
+
+    def test_broken(self):
+        """Test only internal targets missing from the site are reported"""
+        self.assertEqual(
+            self.index.broken(),
+            [
+                {"source": "content/index.md", "kind": "link", "target": "/missing"},
+                {
+                    "source": "content/index.md",
+                    "kind": "image",
+                    "target": "images/gone.png",
+                },
+            ],
+        )
+
+    def test_from_graph(self):
+        """Test an index built from the dependency graph and the static files"""
+        with tempfile.TemporaryDirectory() as tmp:
+            static = os.path.join(tmp, "static")
+            os.makedirs(os.path.join(static, "images"))
+            with open(os.path.join(static, "images", "logo.png"), "wb") as file:
+                file.write(b"png")
+            graph = DependencyGraph()
+            graph.record(
+                "content/index.md",
+                "public/index.html",
+                "template.html",
+                links=["/nowhere"],
+                images=["/images/logo.png"],
+            )
+            index = LinkIndex.from_graph(graph, "public", static)
+            path = os.path.join(tmp, "links.json")
+            index.write_json(path)
+            with open(path, encoding="utf-8") as file:
+                data = json.load(file)
+        self.assertEqual(data["pages"]["content/index.md"]["url"], "/index.html")
+        self.assertEqual([ref["target"] for ref in data["broken"]], ["/nowhere"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,8 +1,25 @@
 """testing main functions"""
 
+import os
 import unittest
+from contextlib import redirect_stderr, redirect_stdout
+from io import StringIO
 
-from main import extract_title
+from main import (
+    copy_source_to_dest,
+    extract_title,
+    find_pages,
+    generate_page,
+    generate_page_streaming,
+    generate_pages_recursive,
+    parse_args,
+)
+from depgraph import DependencyGraph
+from fixtures import TempDirMixin
+from manifest import BuildManifest
+from output import OutputWriter
+from profiling import PAGE_STAGES, BuildProfiler
+from rendercache import RenderCache
 
 
 class TestMain(unittest.TestCase):
@@ -26,5 +43,208 @@ class TestMain(unittest.TestCase):
         """Test extract_title() on multiline text"""
         self.assertEqual(extract_title("Some other stuff\n\n# Delayed"), "Delayed")
 
+    def test_parse_args_image_max_width(self):
+        """Test --image-max-width implies --image-sizes and must be positive"""
+        args = parse_args(["--image-max-width", "640"])
+        self.assertTrue(args.image_sizes)
+        with redirect_stderr(StringIO()), self.assertRaises(SystemExit):
+            parse_args(["--image-max-width", "-5"])
+
+
+class TestGeneratePages(TempDirMixin, unittest.TestCase):
+    """Test generating a tree of pages"""
+
+    def setUp(self):
+        super().setUp()
+        self.content = os.path.join(self.tmp.name, "content")
+        self.template = self.write(
+            "template.html", "<title>{{ Title }}</title>{{ Content }}"
+        )
+        self.write("content/index.md", "# Home\n\nSome *text*")
+        self.write("content/b/index.md", "# B\n\n* one\n* two")
+        self.write("content/a/page.md", "# A\n\n[home](/) and [new](/b/new)")
+        self.write("content/a/notes.txt", "not a page")
+
+    def build(self, dest, jobs):
+        """Build the content into dest, returning the log and the outputs"""
+        log = StringIO()
+        with redirect_stdout(log):
+            generate_pages_recursive(self.content, self.template, dest, jobs=jobs)
+        outputs = {}
+        for _, dest_path in find_pages(self.content, dest):
+            with open(dest_path, encoding="utf-8") as file:
+                outputs[os.path.relpath(dest_path, dest)] = file.read()
+        return log.getvalue().splitlines(), outputs
+
+    def test_find_pages(self):
+        """Test find_pages() returns sorted markdown pages only"""
+        self.assertEqual(
+            find_pages(self.content, "public"),
+            [
+                (os.path.join(self.content, "a", "page.md"), "public/a/page.html"),
+                (os.path.join(self.content, "b", "index.md"), "public/b/index.html"),
+                (os.path.join(self.content, "index.md"), "public/index.html"),
+            ],
+        )
+
+    def test_copy_source_to_dest_keeps_pages(self):
+        """Test copying static files removes stale ones but spares kept ones"""
+        self.write("static/css/site.css", "body {}")
+        self.write("public/index.html", "<p>page</p>")
+        self.write("public/old.css", "p {}")
+        public = self.tmp_path("public")
+        stats = copy_source_to_dest(
+            self.tmp_path("static"),
+            public,
+            keep=lambda path: path.endswith(".html"),
+        )
+        self.assertEqual(stats["files"], 1)
+        self.assertEqual(sorted(os.listdir(public)), ["css", "index.html"])
+
+    def test_generate_page_profiled(self):
+        """Test a profiled page records every stage and matches an unprofiled one"""
+        source = os.path.join(self.content, "index.md")
+        plain = os.path.join(self.tmp.name, "plain.html")
+        profiled = os.path.join(self.tmp.name, "profiled.html")
+        generate_page(source, self.template, plain, logging=False)
+        profiler = BuildProfiler()
+        timings = generate_page(source, self.template, profiled, False, profiler)
+        self.assertEqual(set(timings), set(PAGE_STAGES))
+        self.assertEqual(profiler.pages, {source: timings})
+        with open(plain, encoding="utf-8") as file_one:
+            with open(profiled, encoding="utf-8") as file_two:
+                self.assertEqual(file_one.read(), file_two.read())
+
+    def test_generate_page_render_cache_hit(self):
+        """Test a render cache hit is used instead of parsing the markdown"""
+        source = os.path.join(self.content, "index.md")
+        dest = os.path.join(self.tmp.name, "cached.html")
+        render_cache = RenderCache(os.path.join(self.tmp.name, "render"))
+        with open(source, encoding="utf-8") as file:
+            key = render_cache.key(file.read())
+        render_cache.put(key, "Cached", "<div>from cache</div>")
+        generate_page(source, self.template, dest, False, render_cache=render_cache)
+        with open(dest, encoding="utf-8") as file:
+            self.assertEqual(
+                file.read(), "<title>Cached</title><div>from cache</div>"
+            )
+
+    def test_generate_page_render_cache_miss(self):
+        """Test a render cache miss stores the rendered body"""
+        source = os.path.join(self.content, "index.md")
+        render_cache = RenderCache(os.path.join(self.tmp.name, "render"))
+        for name in ("first.html", "second.html"):
+            generate_page(
+                source,
+                self.template,
+                os.path.join(self.tmp.name, name),
+                False,
+                render_cache=render_cache,
+            )
+        self.assertEqual((render_cache.hits, render_cache.misses), (1, 1))
+
+    def test_generate_page_streaming(self):
+        """Test a streamed page matches the normal one, even with a late title"""
+        source = self.write(
+            "content/late.md",
+            "Intro *text*\n\n> quote\n\n# Late\n\n* a\n* b\n\n```\nx\n```",
+        )
+        plain = os.path.join(self.tmp.name, "plain.html")
+        streamed = os.path.join(self.tmp.name, "streamed", "late.html")
+        generate_page(source, self.template, plain, logging=False)
+        generate_page_streaming(source, self.template, streamed, logging=False)
+        with open(plain, encoding="utf-8") as file_one:
+            with open(streamed, encoding="utf-8") as file_two:
+                self.assertEqual(file_one.read(), file_two.read())
+
+    def test_generate_page_streaming_no_title(self):
+        """Test streaming a page without an h1"""
+        source = self.write("content/untitled.md", "Just text\n\n## Not h1")
+        with self.assertRaises(ValueError) as ve:
+            generate_page_streaming(
+                source, self.template, os.path.join(self.tmp.name, "x.html"), False
+            )
+        self.assertEqual(str(ve.exception), "Markdown requires h1 tag")
+
+    def test_parallel_profiled(self):
+        """Test worker timings are collected by the parent's profiler"""
+        profiler = BuildProfiler()
+        dest = os.path.join(self.tmp.name, "public")
+        generate_pages_recursive(
+            self.content, self.template, dest, jobs=2, profiler=profiler, logging=False
+        )
+        self.assertEqual(len(profiler.pages), 3)
+        self.assertEqual(set(profiler.build), {"discovery", "render"})
+
+    def test_parallel_matches_serial(self):
+        """Test a parallel build writes the same pages as a serial build"""
+        serial_log, serial = self.build(os.path.join(self.tmp.name, "serial"), 1)
+        parallel_log, parallel = self.build(os.path.join(self.tmp.name, "parallel"), 3)
+        self.assertEqual(len(serial), 3)
+        self.assertEqual(serial, parallel)
+        self.assertEqual(len(serial_log), len(parallel_log))
+        self.assertIn("<title>A</title>", serial[os.path.join("a", "page.html")])
+
+    def test_incremental_relinks(self):
+        """Test adding a linked page rebuilds the page linking to it, and only it"""
+        dest = os.path.join(self.tmp.name, "public")
+        manifest = BuildManifest(os.path.join(self.tmp.name, "manifest.json"))
+        graph = DependencyGraph(content_dir=self.content)
+        for jobs in [1, 2]:
+            writer = OutputWriter()
+            generate_pages_recursive(
+                self.content,
+                self.template,
+                dest,
+                manifest,
+                jobs,
+                logging=False,
+                writer=writer,
+                graph=graph,
+            )
+        self.assertEqual(writer.written + writer.skipped, 0)
+        self.write("content/b/new.md", "# New")
+        log = StringIO()
+        with redirect_stdout(log):
+            generate_pages_recursive(
+                self.content, self.template, dest, manifest, graph=graph
+            )
+        self.assertEqual(
+            [line.split()[3] for line in log.getvalue().splitlines()],
+            [
+                os.path.join(self.content, "a", "page.md"),
+                os.path.join(self.content, "b", "new.md"),
+            ],
+        )
+
+    def test_parallel_writer_counts(self):
+        """Test workers report files written and skipped to the parent's writer"""
+        dest = os.path.join(self.tmp.name, "public")
+        for expected in [(3, 0), (0, 3)]:
+            writer = OutputWriter()
+            generate_pages_recursive(
+                self.content, self.template, dest, jobs=2, logging=False, writer=writer
+            )
+            self.assertEqual((writer.written, writer.skipped), expected)
+
+    def test_async_io_caches_and_profiles(self):
+        """Test an async build uses the render cache and profiles every page"""
+        dest = os.path.join(self.tmp.name, "public")
+        render_cache = RenderCache(os.path.join(self.tmp.name, "render"))
+        for expected in [(0, 3), (3, 3)]:
+            profiler = BuildProfiler()
+            generate_pages_recursive(
+                self.content,
+                self.template,
+                dest,
+                profiler=profiler,
+                logging=False,
+                render_cache=render_cache,
+                async_io=True,
+            )
+            self.assertEqual((render_cache.hits, render_cache.misses), expected)
+            self.assertEqual(len(profiler.pages), 3)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,81 @@
+"""testing the build manifest"""
+
+import os
+import unittest
+
+from fixtures import TempDirMixin
+from manifest import BuildManifest, file_hash
+
+
+class TestBuildManifest(TempDirMixin, unittest.TestCase):
+    """Test BuildManifest"""
+
+    def setUp(self):
+        super().setUp()
+        self.source = self.write("index.md", "# Hello")
+        self.template = self.write("template.html", "{{ Content }}")
+        self.dest = self.write("index.html", "<h1>Hello</h1>")
+        self.path = os.path.join(self.tmp.name, "cache", "manifest.json")
+
+    def recorded_manifest(self):
+        """Save a manifest recording the page, and load it back"""
+        manifest = BuildManifest(self.path)
+        manifest.record(self.source, self.dest, [self.template])
+        manifest.save()
+        return BuildManifest(self.path)
+
+    def test_file_hash_missing(self):
+        """Test file_hash() on a missing file"""
+        self.assertIsNone(file_hash(os.path.join(self.tmp.name, "missing")))
+
+    def test_new_page_is_stale(self):
+        """Test a page missing from the manifest is stale"""
+        manifest = BuildManifest(self.path)
+        self.assertTrue(manifest.is_stale(self.source, self.dest, [self.template]))
+
+    def test_recorded_page_is_fresh(self):
+        """Test a recorded, unchanged page is not stale"""
+        manifest = self.recorded_manifest()
+        self.assertFalse(manifest.is_stale(self.source, self.dest, [self.template]))
+
+    def test_changed_source_is_stale(self):
+        """Test editing the markdown makes the page stale"""
+        manifest = self.recorded_manifest()
+        self.write("index.md", "# Goodbye")
+        self.assertTrue(manifest.is_stale(self.source, self.dest, [self.template]))
+
+    def test_changed_template_is_stale(self):
+        """Test editing the template makes the page stale"""
+        manifest = self.recorded_manifest()
+        self.write("template.html", "<body>{{ Content }}</body>")
+        self.assertTrue(manifest.is_stale(self.source, self.dest, [self.template]))
+
+    def test_missing_output_is_stale(self):
+        """Test deleting the output makes the page stale"""
+        manifest = self.recorded_manifest()
+        os.remove(self.dest)
+        self.assertTrue(manifest.is_stale(self.source, self.dest, [self.template]))
+
+    def test_prune_removes_unseen_outputs(self):
+        """Test prune() deletes outputs whose sources disappeared"""
+        manifest = self.recorded_manifest()
+        self.assertEqual(manifest.prune(), [self.dest])
+        self.assertFalse(os.path.exists(self.dest))
+        self.assertEqual(manifest.pages, {})
+
+    def test_prune_keeps_seen_outputs(self):
+        """Test prune() keeps outputs checked during this build"""
+        manifest = self.recorded_manifest()
+        manifest.is_stale(self.source, self.dest, [self.template])
+        self.assertEqual(manifest.prune(), [])
+        self.assertTrue(os.path.exists(self.dest))
+
+    def test_changed_settings_discard_pages(self):
+        """Test a manifest saved with other build settings is ignored"""
+        self.recorded_manifest()
+        manifest = BuildManifest(self.path, {"image_sizes": True})
+        self.assertTrue(manifest.is_stale(self.source, self.dest, [self.template]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+"""testing the output writer"""
+
+import json
+import os
+import pickle
+import unittest
+
+from fixtures import TempDirMixin
+from output import UMASK, OutputWriter, save_json
+
+
+class TestOutputWriter(TempDirMixin, unittest.TestCase):
+    """Test OutputWriter"""
+
+    def setUp(self):
+        super().setUp()
+        self.path = os.path.join(self.tmp.name, "public", "blog", "index.html")
+        self.writer = OutputWriter()
+
+    def read(self):
+        """Read the output file"""
+        with open(self.path, encoding="utf-8") as file:
+            return file.read()
+
+    def backdate(self):
+        """Set the output's mtime into the past, and return it"""
+        os.utime(self.path, (0, 0))
+        return os.stat(self.path).st_mtime_ns
+
+    def leftovers(self):
+        """List the temp files left next to the output"""
+        folder = os.path.dirname(self.path)
+        return [name for name in os.listdir(folder) if name.endswith(".tmp")]
+
+    def test_write_new(self):
+        """Test a new file is written, creating its folder"""
+        self.assertTrue(self.writer.write(self.path, "<p>é</p>"))
+        self.assertEqual(self.read(), "<p>é</p>")
+        self.assertEqual(os.stat(self.path).st_mode & 0o777, 0o666 & ~UMASK)
+        self.assertEqual(self.leftovers(), [])
+
+    def test_write_unchanged_skipped(self):
+        """Test identical content is not rewritten, keeping the mtime"""
+        self.writer.write(self.path, "<p>same</p>")
+        mtime = self.backdate()
+        self.assertFalse(self.writer.write(self.path, "<p>same</p>"))
+        self.assertEqual(os.stat(self.path).st_mtime_ns, mtime)
+        self.assertEqual(self.writer.summary(), "Output: 1 written, 1 unchanged")
+
+    def test_write_same_size_changed(self):
+        """Test content of the same size but different bytes is rewritten"""
+        self.writer.write(self.path, "<p>aaaa</p>")
+        self.assertTrue(self.writer.write(self.path, "<p>bbbb</p>"))
+        self.assertEqual(self.read(), "<p>bbbb</p>")
+
+    def test_open_unchanged_skipped(self):
+        """Test a streamed output identical to the existing file is discarded"""
+        self.writer.write(self.path, "<p>one</p><p>two</p>")
+        mtime = self.backdate()
+        with self.writer.open(self.path) as file:
+            file.write("<p>one</p>")
+            file.write("<p>two</p>")
+        self.assertEqual(os.stat(self.path).st_mtime_ns, mtime)
+        self.assertEqual((self.writer.written, self.writer.skipped), (1, 1))
+        self.assertEqual(self.leftovers(), [])
+
+    def test_open_error_keeps_old_file(self):
+        """Test a failed streamed write leaves the old output in place"""
+        self.writer.write(self.path, "<p>old</p>")
+        with self.assertRaises(ValueError):
+            with self.writer.open(self.path) as file:
+                file.write("<p>half")
+                raise ValueError("render failed")
+        self.assertEqual(self.read(), "<p>old</p>")
+        self.assertEqual(self.leftovers(), [])
+
+    def test_pickle_and_merge(self):
+        """Test a pickled writer starts from zero and its counts merge back"""
+        self.writer.write(self.path, "<p>x</p>")
+        copy = pickle.loads(pickle.dumps(self.writer))
+        self.assertEqual((copy.written, copy.skipped), (0, 0))
+        copy.write(self.path, "<p>x</p>")
+        self.writer.merge(copy.take_changes())
+        self.assertEqual((self.writer.written, self.writer.skipped), (1, 1))
+        self.assertEqual((copy.written, copy.skipped), (0, 0))
+
+    def test_save_json(self):
+        """Test save_json creates the folder and replaces the file atomically"""
+        save_json(self.path, {"a": 1})
+        save_json(self.path, {"a": 2})
+        with open(self.path, encoding="utf-8") as file:
+            self.assertEqual(json.load(file), {"a": 2})
+        self.assertEqual(os.stat(self.path).st_mode & 0o777, 0o666 & ~UMASK)
+        self.assertEqual(self.leftovers(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
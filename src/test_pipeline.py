@@ -0,0 +1,76 @@
+"""testing the asyncio build pipeline"""
+
+import time
+import unittest
+
+from fixtures import TempDirMixin
+from main import find_pages, generate_page
+from output import OutputWriter
+from pipeline import build_pages_pipelined, read_text
+
+LATENCY = 0.02
+
+
+def slow_read(path):
+    """read_text() on a stand-in for a high-latency volume"""
+    time.sleep(LATENCY)
+    return read_text(path)
+
+
+def slow_write(path, text):
+    """OutputWriter.write() on a stand-in for a high-latency volume"""
+    time.sleep(LATENCY)
+    OutputWriter().write(path, text)
+
+
+class TestPipeline(TempDirMixin, unittest.TestCase):
+    """Test build_pages_pipelined()"""
+
+    def setUp(self):
+        super().setUp()
+        self.template = self.write(
+            "template.html", "<title>{{ Title }}</title>{{ Content }}"
+        )
+        for n in range(12):
+            self.write(f"content/s{n % 3}/p{n}.md", f"# Page {n}\n\n*{n}*")
+        self.pages = find_pages(self.tmp_path("content"), self.tmp_path("public"))
+
+    def test_matches_generate_page(self):
+        """Test the pipeline writes the same pages as generate_page()"""
+        written = build_pages_pipelined(self.pages, self.template, logging=False)
+        self.assertEqual(sorted(written), self.pages)
+        for source, dest in self.pages:
+            expected = self.tmp_path("expected.html")
+            generate_page(source, self.template, expected, logging=False)
+            self.assertEqual(read_text(dest), read_text(expected))
+
+    def test_overlaps_slow_io(self):
+        """Test slow reads and writes overlap rather than add up"""
+        start = time.perf_counter()
+        build_pages_pipelined(
+            self.pages,
+            self.template,
+            read_file=slow_read,
+            write_file=slow_write,
+            logging=False,
+        )
+        elapsed = time.perf_counter() - start
+        self.assertLess(elapsed, len(self.pages) * 2 * LATENCY / 2)
+
+    def test_small_queues(self):
+        """Test backpressure with single item queues and one I/O worker"""
+        written = build_pages_pipelined(
+            self.pages, self.template, prefetch=1, io_workers=1, logging=False
+        )
+        self.assertEqual(written, self.pages)
+
+    def test_render_error(self):
+        """Test a page that fails to render raises its own error"""
+        self.write("content/bad.md", "no title")
+        pages = find_pages(self.tmp_path("content"), self.tmp_path("public"))
+        with self.assertRaises(ValueError):
+            build_pages_pipelined(pages, self.template, logging=False)
+
+
+if __name__ == "__main__":
+    unittest.main()
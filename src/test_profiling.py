@@ -0,0 +1,74 @@
+"""testing the build profiler"""
+
+import json
+import os
+import tempfile
+import unittest
+
+from profiling import PAGE_STAGES, BuildProfiler, stage
+
+
+class TestBuildProfiler(unittest.TestCase):
+    """Test BuildProfiler"""
+
+    def profiler(self):
+        """A profiler with two pages and one build stage"""
+        profiler = BuildProfiler()
+        profiler.add_page("a.md", {"read": 0.001, "write": 0.002})
+        profiler.add_page("b.md", {"read": 0.004, "inline parse": 0.010})
+        profiler.build["static"] = 0.5
+        return profiler
+
+    def test_stage_accumulates(self):
+        """Test stage() adds up time for a page and for the build"""
+        profiler = BuildProfiler()
+        with profiler.stage("read", "a.md"):
+            pass
+        with profiler.stage("read", "a.md"):
+            pass
+        with profiler.stage("static"):
+            pass
+        self.assertEqual(list(profiler.pages), ["a.md"])
+        self.assertGreaterEqual(profiler.pages["a.md"]["read"], 0.0)
+        self.assertIn("static", profiler.build)
+
+    def test_stage_without_profiler(self):
+        """Test the module level stage() is a no-op without a profiler"""
+        with stage(None, "read", "a.md"):
+            pass
+
+    def test_stage_totals(self):
+        """Test totals cover every page stage"""
+        totals = self.profiler().stage_totals()
+        self.assertEqual(list(totals), list(PAGE_STAGES))
+        self.assertAlmostEqual(totals["read"], 0.005)
+        self.assertEqual(totals["block scan"], 0.0)
+
+    def test_slowest(self):
+        """Test pages are ordered slowest first"""
+        slowest = self.profiler().slowest(1)
+        self.assertEqual(len(slowest), 1)
+        self.assertEqual(slowest[0][0], "b.md")
+        self.assertAlmostEqual(slowest[0][1], 0.014)
+
+    def test_report(self):
+        """Test the printed report"""
+        report = self.profiler().report()
+        self.assertIn("static", report)
+        self.assertIn("Page stages (2 pages):", report)
+        self.assertLess(report.index("b.md"), report.index("a.md"))
+
+    def test_write_json(self):
+        """Test the JSON report"""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "reports", "profile.json")
+            self.profiler().write_json(path)
+            with open(path, encoding="utf-8") as file:
+                report = json.load(file)
+        self.assertEqual(report["build"], {"static": 0.5})
+        self.assertEqual(set(report["pages"]), {"a.md", "b.md"})
+        self.assertAlmostEqual(report["stages"]["write"], 0.002)
+
+
+if __name__ == "__main__":
+    unittest.main()
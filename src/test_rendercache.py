@@ -0,0 +1,50 @@
+"""testing the on-disk render cache"""
+
+import os
+import unittest
+
+from fixtures import TempDirMixin
+from rendercache import RenderCache
+
+
+class TestRenderCache(TempDirMixin, unittest.TestCase):
+    """Test RenderCache"""
+
+    def setUp(self):
+        super().setUp()
+        self.cache = RenderCache(os.path.join(self.tmp.name, "render"))
+
+    def test_key(self):
+        """Test keys depend on the markdown"""
+        self.assertEqual(RenderCache.key("# a"), RenderCache.key("# a"))
+        self.assertNotEqual(RenderCache.key("# a"), RenderCache.key("# b"))
+
+    def test_get_and_put(self):
+        """Test a stored entry is returned, and misses are counted"""
+        key = RenderCache.key("# Title")
+        self.assertIsNone(self.cache.get(key))
+        self.cache.put(key, "Title", "<div><h1>Title</h1></div>")
+        self.assertEqual(self.cache.get(key), ("Title", "<div><h1>Title</h1></div>"))
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+        shard = os.path.dirname(self.cache.entry_path(key))
+        self.assertEqual(os.listdir(shard), [f"{key}.json"])
+
+    def test_evict_oldest_first(self):
+        """Test eviction removes least recently used entries until under the limit"""
+        keys = [RenderCache.key(str(n)) for n in range(3)]
+        for age, key in enumerate(keys):
+            self.cache.put(key, "t", "x" * 100)
+            os.utime(self.cache.entry_path(key), ns=(age, age))
+        size = os.path.getsize(self.cache.entry_path(keys[0]))
+        self.cache.max_bytes = size * 2
+        self.assertEqual(self.cache.evict(), 1)
+        self.assertIsNone(self.cache.get(keys[0]))
+        self.assertIsNotNone(self.cache.get(keys[2]))
+
+    def test_evict_missing_directory(self):
+        """Test evicting an empty cache"""
+        self.assertEqual(self.cache.evict(), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+"""testing compiled templates"""
+
+import os
+import tempfile
+import unittest
+from io import StringIO
+
+from htmlnode import LeafNode, ParentNode
+from template import Template, load_template
+
+
+class TestTemplate(unittest.TestCase):
+    """Test Template"""
+
+    def test_names(self):
+        """Test placeholders are found, with or without spaces"""
+        template = Template("<title>{{ Title }}</title>{{Content}}{{  Footer  }}")
+        self.assertEqual(template.names, ["Title", "Content", "Footer"])
+
+    def test_render(self):
+        """Test rendering strings into placeholders"""
+        template = Template("<title> {{ Title }} </title><p>{{ Title }}</p>")
+        self.assertEqual(
+            template.render({"Title": "Hi"}), "<title> Hi </title><p>Hi</p>"
+        )
+
+    def test_render_missing_value(self):
+        """Test placeholders without a value are left alone"""
+        template = Template("a {{ Title }} b {{ Other }} c")
+        self.assertEqual(template.render({"Title": "x"}), "a x b {{ Other }} c")
+
+    def test_render_no_placeholders(self):
+        """Test a template without placeholders"""
+        self.assertEqual(Template("plain").render({"Title": "x"}), "plain")
+
+    def test_render_to_streams_nodes(self):
+        """Test render_to() writes HTMLNodes to the sink"""
+        template = Template("<article>{{ Content }}</article>")
+        sink = StringIO()
+        template.render_to(sink, {"Content": ParentNode("p", [LeafNode("b", "x")])})
+        self.assertEqual(sink.getvalue(), "<article><p><b>x</b></p></article>")
+        self.assertEqual(
+            template.render({"Content": ParentNode("p", [LeafNode("b", "x")])}),
+            sink.getvalue(),
+        )
+
+    def test_load_template_cached(self):
+        """Test load_template() reuses the compiled template until the file changes"""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "template.html")
+            with open(path, "w", encoding="utf-8") as file:
+                file.write("{{ Title }}")
+            first = load_template(path)
+            self.assertIs(load_template(path), first)
+
+            with open(path, "w", encoding="utf-8") as file:
+                file.write("<h1>{{ Title }}</h1>")
+            os.utime(path, ns=(0, 0))
+            second = load_template(path)
+            self.assertIsNot(second, first)
+            self.assertEqual(second.render({"Title": "x"}), "<h1>x</h1>")
+
+
+if __name__ == "__main__":
+    unittest.main()
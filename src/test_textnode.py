@@ -15,10 +15,12 @@ from textnode import (
     ordered_list_to_html_node,
     paragraph_to_html_node,
     quote_to_html_node,
+    scan_blocks,
     split_nodes_image,
     split_nodes_link,
     extract_markdown_links,
     split_nodes_delimiter,
+    split_nodes_delimiters,
     swap_types,
     text_to_textnodes,
     unordered_list_to_html_node,
@@ -34,6 +36,13 @@ class TestTextNode(unittest.TestCase):
         node2 = TextNode("This is a text node", TextType.BOLD)
         self.assertEqual(node, node2)
 
+    def test_no_instance_dict(self):
+        """Test TextNode uses __slots__ rather than a per-instance __dict__"""
+        node = TextNode("This is a text node", TextType.BOLD)
+        self.assertFalse(hasattr(node, "__dict__"))
+        with self.assertRaises(AttributeError):
+            node.extra = True
+
     def test_eq_with_url(self):
         """Test equality with URL"""
         node = TextNode("This is a text node", TextType.ITALIC, "a url")
@@ -182,6 +191,31 @@ class TestTextFunctions(unittest.TestCase):
             split_nodes_delimiter([node], "*", TextType.BOLD)
         self.assertEqual(str(ve.exception), "Missing delimiter")
 
+    def test_split_nodes_delimiters(self):
+        """Test split_nodes_delimiters splits bold, italic and code in one scan"""
+        node = TextNode("A **b** *i* `c*d` and **** done", TextType.NORMAL)
+        self.assertEqual(
+            split_nodes_delimiters([node, TextNode("*x*", TextType.CODE)]),
+            [
+                TextNode("A ", TextType.NORMAL),
+                TextNode("b", TextType.BOLD),
+                TextNode(" ", TextType.NORMAL),
+                TextNode("i", TextType.ITALIC),
+                TextNode(" ", TextType.NORMAL),
+                TextNode("c*d", TextType.CODE),
+                TextNode(" and ", TextType.NORMAL),
+                TextNode(" done", TextType.NORMAL),
+                TextNode("*x*", TextType.CODE),
+            ],
+        )
+
+    def test_split_nodes_delimiters_unpaired(self):
+        """Test split_nodes_delimiters when a delimiter is never closed"""
+        node = TextNode("Fine **bold** but `open", TextType.NORMAL)
+        with self.assertRaises(ValueError) as ve:
+            split_nodes_delimiters([node])
+        self.assertEqual(str(ve.exception), "Missing delimiter")
+
     def test_extract_markdown_images_single(self):
         """Test extract_markdown_images, single image"""
         self.assertEqual(
@@ -322,6 +356,19 @@ class TestTextFunctions(unittest.TestCase):
             ],
         )
 
+    def test_split_nodes_link_repeated(self):
+        """Test split_nodes_link with the same link twice keeps the text between"""
+        node = TextNode("[a](b.com) and [a](b.com) again", TextType.NORMAL)
+        self.assertEqual(
+            split_nodes_link([node]),
+            [
+                TextNode("a", TextType.LINK, "b.com"),
+                TextNode(" and ", TextType.NORMAL),
+                TextNode("a", TextType.LINK, "b.com"),
+                TextNode(" again", TextType.NORMAL),
+            ],
+        )
+
     def test_text_to_textnodes_plain(self):
         """Test text_to_textnodes, plain text"""
         self.assertEqual(
@@ -373,6 +420,24 @@ class TestTextFunctions(unittest.TestCase):
             ],
         )
 
+    def test_text_to_textnodes_linked_image(self):
+        """Test text_to_textnodes, an image inside link brackets stays an image"""
+        self.assertEqual(
+            text_to_textnodes("[![badge](img.svg)](http://x)"),
+            [
+                TextNode("[", TextType.NORMAL),
+                TextNode("badge", TextType.IMAGE, "img.svg"),
+                TextNode("](http://x)", TextType.NORMAL),
+            ],
+        )
+        self.assertEqual(
+            text_to_textnodes("Start [see ![logo](/l.png)"),
+            [
+                TextNode("Start [see ", TextType.NORMAL),
+                TextNode("logo", TextType.IMAGE, "/l.png"),
+            ],
+        )
+
     def test_text_to_textnodes_everything(self):
         """Test text_to_textnodes, all at once"""
         self.assertEqual(
@@ -395,6 +460,34 @@ class TestTextFunctions(unittest.TestCase):
             ],
         )
 
+    def test_text_to_textnodes_repeated_link(self):
+        """Test text_to_textnodes, the same link twice"""
+        self.assertEqual(
+            text_to_textnodes("[a](b) and [a](b) end"),
+            [
+                TextNode("a", TextType.LINK, "b"),
+                TextNode(" and ", TextType.NORMAL),
+                TextNode("a", TextType.LINK, "b"),
+                TextNode(" end", TextType.NORMAL),
+            ],
+        )
+
+    def test_text_to_textnodes_unmatched_brackets(self):
+        """Test text_to_textnodes, brackets that are not links or images"""
+        self.assertEqual(
+            text_to_textnodes("A [note] and ![] with *it*"),
+            [
+                TextNode("A [note] and ![] with ", TextType.NORMAL),
+                TextNode("it", TextType.ITALIC),
+            ],
+        )
+
+    def test_text_to_textnodes_unpaired_delimiter(self):
+        """Test text_to_textnodes, unclosed bold"""
+        with self.assertRaises(ValueError) as ve:
+            text_to_textnodes("Only **one")
+        self.assertEqual(str(ve.exception), "Missing delimiter")
+
     def test_markdown_to_blocks_single(self):
         """Test markdown_to_blocks() on a single line string"""
         self.assertEqual(markdown_to_blocks("Simple text"), ["Simple text"])
@@ -505,6 +598,40 @@ class TestTextFunctions(unittest.TestCase):
             block_to_block_type("* line one\nline two"), BlockType.PARAGRAPH
         )
 
+    def test_block_to_block_type_ordered_numbering(self):
+        """Test block_to_block_type() requires consecutive ordered list numbers"""
+        self.assertEqual(
+            block_to_block_type("1. a\n2. b\n3. c"), BlockType.ORDERED_LIST
+        )
+        self.assertEqual(block_to_block_type("1. a\n3. c"), BlockType.PARAGRAPH)
+
+    def test_scan_blocks(self):
+        """Test scan_blocks() splits and classifies like the separate passes"""
+        markdown = (
+            "# Title\n\n\n> quote\n> more\n\n* a\n- b\n\n \t\n\n1. x\n2. y\n\ntext"
+        )
+        self.assertEqual(
+            list(scan_blocks(markdown)),
+            [
+                (block_to_block_type(block), block)
+                for block in markdown_to_blocks(markdown)
+            ],
+        )
+        self.assertEqual(
+            [block_type for block_type, _ in scan_blocks(markdown)],
+            [
+                BlockType.HEADING,
+                BlockType.QUOTE,
+                BlockType.UNORDERED_LIST,
+                BlockType.ORDERED_LIST,
+                BlockType.PARAGRAPH,
+            ],
+        )
+
+    def test_scan_blocks_whitespace_only(self):
+        """Test scan_blocks() on whitespace only input"""
+        self.assertEqual(list(scan_blocks("\n \n\n\t\n")), [])
+
     def test_block_type_to_helper_function_paragraph(self):
         """Test block_type_to_helper_function for paragraph"""
         self.assertEqual(
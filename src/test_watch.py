@@ -0,0 +1,166 @@
+"""testing watch mode"""
+
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+from depgraph import DependencyGraph
+from fixtures import TempDirMixin
+from watch import SiteWatcher, diff_snapshots, snapshot
+
+
+class TestSnapshots(unittest.TestCase):
+    """Test snapshot() and diff_snapshots()"""
+
+    def test_diff_snapshots(self):
+        """Test changed, added and removed files are reported"""
+        old = {"a": (1, 1), "b": (1, 1), "c": (1, 1)}
+        new = {"a": (1, 1), "b": (2, 1), "d": (1, 1)}
+        self.assertEqual(diff_snapshots(old, new), ({"b", "d"}, {"c"}))
+
+    def test_snapshot_file_and_tree(self):
+        """Test snapshot() of a directory tree and a single file"""
+        with tempfile.TemporaryDirectory() as tmp:
+            os.makedirs(os.path.join(tmp, "dir", "sub"))
+            for name in ("file.txt", os.path.join("dir", "sub", "deep.txt")):
+                with open(os.path.join(tmp, name), "w", encoding="utf-8") as file:
+                    file.write("x")
+            files = snapshot(os.path.join(tmp, "dir"), os.path.join(tmp, "file.txt"))
+            self.assertEqual(
+                set(files),
+                {
+                    os.path.join(tmp, "dir", "sub", "deep.txt"),
+                    os.path.join(tmp, "file.txt"),
+                },
+            )
+
+
+class TestSiteWatcher(TempDirMixin, unittest.TestCase):
+    """Test SiteWatcher"""
+
+    def setUp(self):
+        super().setUp()
+        self.content = self.tmp_path("content")
+        self.static = self.tmp_path("static")
+        self.template = self.write("template.html", "{{ Content }}")
+        self.write("content/index.md", "# Home")
+        self.write("content/blog/post.md", "# Post")
+        self.write("static/index.css", "body {}")
+        self.rendered = []
+        self.watcher = SiteWatcher(
+            self.content,
+            self.static,
+            self.template,
+            self.tmp_path("public"),
+            lambda source, dest: self.rendered.append((source, dest)),
+            logging=False,
+        )
+
+    def test_no_changes(self):
+        """Test polling an unchanged tree does nothing"""
+        self.assertEqual(self.watcher.poll(), [])
+        self.assertEqual(self.rendered, [])
+
+    def test_page_edit(self):
+        """Test editing a page re-renders only that page"""
+        source = self.write("content/blog/post.md", "# Edited", mtime=1)
+        dest = self.tmp_path("public/blog/post.html")
+        self.assertEqual(self.watcher.poll(), [dest])
+        self.assertEqual(self.rendered, [(source, dest)])
+
+    def test_template_edit(self):
+        """Test editing the template re-renders every page"""
+        self.write("template.html", "<main>{{ Content }}</main>", mtime=1)
+        self.watcher.poll()
+        self.assertEqual(
+            sorted(dest for _, dest in self.rendered),
+            [
+                self.tmp_path("public/blog/post.html"),
+                self.tmp_path("public/index.html"),
+            ],
+        )
+
+    def test_static_add_and_remove(self):
+        """Test static files are copied when added and removed when deleted"""
+        self.write("static/images/logo.svg", "<svg/>")
+        dest = self.tmp_path("public/images/logo.svg")
+        self.assertEqual(self.watcher.poll(), [dest])
+        self.assertTrue(os.path.exists(dest))
+
+        os.remove(self.tmp_path("static/images/logo.svg"))
+        self.assertEqual(self.watcher.poll(), [dest])
+        self.assertFalse(os.path.exists(dest))
+        self.assertEqual(self.rendered, [])
+
+    def test_vanished_files_skipped(self):
+        """Test files deleted mid-update are reported and the rest still built"""
+        missing_page = self.tmp_path("content/gone.md")
+        missing_static = self.tmp_path("static/gone.css")
+        page = self.tmp_path("content/index.md")
+        self.watcher.render_page = lambda source, dest: os.stat(source)
+        log = StringIO()
+        with redirect_stdout(log):
+            outputs = self.watcher.apply({missing_page, missing_static, page}, set())
+        self.assertEqual(outputs, [self.tmp_path("public/index.html")])
+        self.assertIn(f"Error copying {missing_static}", log.getvalue())
+        self.assertIn(f"Error rendering {missing_page}", log.getvalue())
+
+    def test_page_removed(self):
+        """Test deleting a page deletes its output"""
+        dest = self.write("public/index.html", "old")
+        os.remove(self.tmp_path("content/index.md"))
+        self.assertEqual(self.watcher.poll(), [dest])
+        self.assertFalse(os.path.exists(dest))
+
+
+class TestSiteWatcherGraph(TestSiteWatcher):
+    """Test SiteWatcher rebuilding from a DependencyGraph"""
+
+    def setUp(self):
+        super().setUp()
+        self.graph = DependencyGraph(content_dir=self.content, static_dir=self.static)
+        self.graph.record(
+            self.tmp_path("content/index.md"),
+            self.tmp_path("public/index.html"),
+            self.template,
+            links=["/blog/post", "/blog/gone"],
+            images=["/logo.png"],
+        )
+        self.graph.record(
+            self.tmp_path("content/blog/post.md"),
+            self.tmp_path("public/blog/post.html"),
+            self.template,
+        )
+        self.watcher.graph = self.graph
+
+    def test_image_edit(self):
+        """Test editing an image re-renders only the pages showing it"""
+        self.write("static/logo.png", "png", mtime=1)
+        self.watcher.poll()
+        self.assertEqual(
+            self.rendered,
+            [(self.tmp_path("content/index.md"), self.tmp_path("public/index.html"))],
+        )
+
+    def test_linked_page_added(self):
+        """Test adding a linked page re-renders the pages linking to it"""
+        self.write("content/blog/gone.md", "# Back")
+        self.watcher.poll()
+        self.assertEqual(
+            sorted(source for source, _ in self.rendered),
+            [self.tmp_path("content/blog/gone.md"), self.tmp_path("content/index.md")],
+        )
+
+    def test_page_removed(self):
+        """Test deleting a page re-renders its linkers and forgets it"""
+        super().test_page_removed()
+        self.assertNotIn(self.tmp_path("content/index.md"), self.graph.pages)
+        os.remove(self.tmp_path("content/blog/post.md"))
+        self.watcher.poll()
+        self.assertEqual(self.rendered, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
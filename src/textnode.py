@@ -5,6 +5,9 @@ import re
 
 from htmlnode import HTMLNode, LeafNode, ParentNode
 
+# bump whenever rendered HTML changes, to invalidate persisted caches
+RENDERER_VERSION = "1"
+
 
 class TextType(Enum):
     """Text type enumeration: normal, bold, etc..."""
@@ -31,6 +34,8 @@ class BlockType(Enum):
 class TextNode:
     """Text node, defined by text, a type, and an optional url"""
 
+    __slots__ = ("text", "text_type", "url")
+
     def __init__(self, text: str, text_type: TextType, url: str = None):
         self.text = text
         self.text_type = text_type
@@ -84,71 +89,144 @@ def split_nodes_delimiter(
     old_nodes: list[TextNode], delimiter: str, text_type: TextType
 ):
     """Split nodes based on delimiter. Anything within the delimiter gets the text_type"""
+    opener = re.compile(re.escape(delimiter))
     new_nodes = []
     for node in old_nodes:
         if node.text_type != TextType.NORMAL:
             new_nodes.append(node)
-        else:
-            if node.text.count(delimiter) % 2 == 1:
+            continue
+        split_delimited(node, opener, {delimiter: text_type}, new_nodes)
+    return new_nodes
+
+
+DELIMITER_TYPES = {"**": TextType.BOLD, "*": TextType.ITALIC, "`": TextType.CODE}
+DELIMITER_PATTERN = re.compile(r"\*\*?|`")
+
+
+def split_nodes_delimiters(old_nodes: list[TextNode]):
+    """Split bold, italic and code out of normal nodes in one scan per node"""
+    new_nodes = []
+    for node in old_nodes:
+        if node.text_type != TextType.NORMAL:
+            new_nodes.append(node)
+            continue
+        split_delimited(node, DELIMITER_PATTERN, DELIMITER_TYPES, new_nodes)
+    return new_nodes
+
+
+def split_delimited(node: TextNode, opener: re.Pattern, types: dict, new_nodes: list):
+    """Append the non-empty pieces of node, split on delimiters, to new_nodes
+
+    Scans left to right, switching between two states: outside a span,
+    searching for the next opening token, and inside one, searching only for
+    the delimiter that opened it. Opening tokens not in types, [ and ![,
+    start a link or an image when one matches there
+    """
+    text, text_type, url = node.text, node.text_type, node.url
+    append = new_nodes.append
+    search = opener.search
+    start = position = 0
+    while (marker := search(text, position)) is not None:
+        token = marker.group()
+        open_start, inner_start = marker.span()
+        if token in types:
+            inner_end = text.find(token, inner_start)
+            if inner_end == -1:
                 raise ValueError("Missing delimiter")
-            new_type = TextType.NORMAL
-            for text in node.text.split(delimiter):
-                new_nodes.append(TextNode(text, new_type, node.url))
-                new_type = swap_types(new_type, TextType.NORMAL, text_type)
-    return [n for n in new_nodes if n.text != ""]
+            new_node = TextNode(text[inner_start:inner_end], types[token], url)
+            end = inner_end + len(token)
+        else:
+            reference = match_reference(text, open_start)
+            if reference is None:
+                position = inner_start
+                continue
+            new_node, end = reference
+        if start < open_start:
+            append(TextNode(text[start:open_start], text_type, url))
+        if new_node.text != "":
+            append(new_node)
+        start = position = end
+    if start < len(text):
+        append(TextNode(text[start:], text_type, url))
+
+
+IMAGE_PATTERN = re.compile(r"!\[([^\]]+)\]\(([^\)]+)\)")
+LINK_PATTERN = re.compile(r"\[([^\]]+)\]\(([^\)]+)\)")
 
 
 def extract_markdown_images(text: str):
     """Extract url and alt text or markdown images"""
-    return re.findall(r"!\[([^\]]+)\]\(([^\)]+)\)", text)
+    return IMAGE_PATTERN.findall(text)
 
 
 def extract_markdown_links(text: str):
     """Extract url and alt text or markdown images"""
-    return re.findall(r"\[([^\]]+)\]\(([^\)]+)\)", text)
+    return LINK_PATTERN.findall(text)
 
 
 def split_nodes_image(old_nodes: list[TextNode]):
     """Separate out image nodes"""
-    return split_nodes_general(
-        old_nodes, TextType.IMAGE, "![{}]({})", extract_markdown_images
-    )
+    return split_nodes_general(old_nodes, TextType.IMAGE, IMAGE_PATTERN)
 
 
 def split_nodes_link(old_nodes: list[TextNode]):
     """Separate out link nodes"""
-    return split_nodes_general(
-        old_nodes, TextType.LINK, "[{}]({})", extract_markdown_links
-    )
+    return split_nodes_general(old_nodes, TextType.LINK, LINK_PATTERN)
 
 
 def split_nodes_general(
-    old_nodes: list[TextNode],
-    text_type: TextType,
-    format_string: str,
-    extract_function,
+    old_nodes: list[TextNode], text_type: TextType, pattern: re.Pattern
 ):
-    """Split out nodes based on format string and extract function"""
+    """Split out nodes matching pattern, slicing the text between match spans"""
     new_nodes = []
     for n in old_nodes:
         node_text = n.text
-        for l in extract_function(n.text):
-            split = node_text.split(format_string.format(l[0], l[1]))
-            new_nodes.append(TextNode(split[0], n.text_type))
-            new_nodes.append(TextNode(l[0], text_type, l[1]))
-            node_text = split[1]
-        new_nodes.append(TextNode(node_text, n.text_type, n.url))
-    return [n for n in new_nodes if n.text != ""]
+        start = 0
+        for match in pattern.finditer(node_text):
+            if start < match.start():
+                new_nodes.append(
+                    TextNode(node_text[start : match.start()], n.text_type)
+                )
+            new_nodes.append(TextNode(match.group(1), text_type, match.group(2)))
+            start = match.end()
+        if start < len(node_text):
+            new_nodes.append(TextNode(node_text[start:], n.text_type, n.url))
+    return new_nodes
+
+
+INLINE_MARKER_PATTERN = re.compile(r"!\[|\[|\*\*?|`")
+
+
+def image_within(text: str, start: int, end: int):
+    """Check whether an image starts inside text[start:end]
+
+    Images take priority over links, so a link overlapping one is plain text
+    """
+    position = text.find("![", start, end)
+    while position != -1:
+        if IMAGE_PATTERN.match(text, position):
+            return True
+        position = text.find("![", position + 1, end)
+    return False
+
+
+def match_reference(text: str, start: int):
+    """(TextNode, end) of the image or link at text[start], or None"""
+    is_image = text.startswith("![", start)
+    match = (IMAGE_PATTERN if is_image else LINK_PATTERN).match(text, start)
+    if match is None or (not is_image and image_within(text, start + 1, match.end())):
+        return None
+    text_type = TextType.IMAGE if is_image else TextType.LINK
+    return TextNode(match.group(1), text_type, match.group(2)), match.end()
 
 
 def text_to_textnodes(text: str):
-    """Convert text to list of TextNodes"""
-    new_nodes = split_nodes_image([TextNode(text, TextType.NORMAL)])
-    new_nodes = split_nodes_link(new_nodes)
-    new_nodes = split_nodes_delimiter(new_nodes, "**", TextType.BOLD)
-    new_nodes = split_nodes_delimiter(new_nodes, "*", TextType.ITALIC)
-    new_nodes = split_nodes_delimiter(new_nodes, "`", TextType.CODE)
-    return new_nodes
+    """Convert text to list of TextNodes in a single left-to-right pass"""
+    nodes = []
+    split_delimited(
+        TextNode(text, TextType.NORMAL), INLINE_MARKER_PATTERN, DELIMITER_TYPES, nodes
+    )
+    return nodes
 
 
 def markdown_to_blocks(markdown: str):
@@ -156,57 +234,82 @@ def markdown_to_blocks(markdown: str):
     return [line.strip() for line in markdown.split("\n\n") if line.strip() != ""]
 
 
+HEADING_PATTERN = re.compile(r"#{1,6} ")
+
+
 def block_to_block_type(block: str):
-    """Convert block to BlockType"""
+    """Convert block to BlockType, checking all line-based types in one pass"""
     # headings start with 1-6 '#'
-    for n in range(6):
-        if block.startswith(f"{'#'*(n+1)} "):
-            return BlockType.HEADING
+    if HEADING_PATTERN.match(block):
+        return BlockType.HEADING
 
     # code blocks start and end with '```'
     if block.startswith("```") and block.endswith("```"):
         return BlockType.CODE
 
     # quote blocks start every line with >
-    is_quote_block = True
-    for line in block.splitlines():
-        if not line.startswith(">"):
-            is_quote_block = False
+    # unordered list blocks start every line with '* ' or '- '
+    # ordered list blocks start every line with 'n. ', n >= 1
+    is_quote_block = is_unordered_list = is_ordered_list = True
+    for line_number, line in enumerate(block.splitlines(), 1):
+        is_quote_block = is_quote_block and line.startswith(">")
+        is_unordered_list = is_unordered_list and line.startswith(("* ", "- "))
+        is_ordered_list = is_ordered_list and line.startswith(f"{line_number}. ")
+        if not (is_quote_block or is_unordered_list or is_ordered_list):
+            return BlockType.PARAGRAPH
     if is_quote_block:
         return BlockType.QUOTE
-
-    # unordered list blocks start every line with '* ' or '- '
-    is_unordered_list = True
-    for line in block.splitlines():
-        if not line.startswith("* ") and not line.startswith("- "):
-            is_unordered_list = False
     if is_unordered_list:
         return BlockType.UNORDERED_LIST
+    return BlockType.ORDERED_LIST
 
-    # ordered list blocks start every line with 'n. ', n >= 1
-    is_ordered_list = True
-    line_number = 0
-    for line in block.splitlines():
-        line_number += 1
-        if not line.startswith(f"{line_number}. "):
-            is_ordered_list = False
-    if is_ordered_list:
-        return BlockType.ORDERED_LIST
 
-    return BlockType.PARAGRAPH
+def scan_blocks(markdown: str):
+    """Split markdown into blocks and classify them, yielding (BlockType, block)
+
+    Gives the same blocks as markdown_to_blocks, in a single pass over the lines
+    """
+    return scan_block_lines(markdown.split("\n"))
 
 
-def markdown_to_html_node(markdown: str):
-    """Convert markdown to full html node"""
+def scan_block_lines(lines):
+    """Yield (BlockType, block) from an iterable of lines without line endings"""
+    block_lines = []
+    for line in lines:
+        if line:
+            block_lines.append(line)
+            continue
+        if block_lines:
+            block = "\n".join(block_lines).strip()
+            block_lines = []
+            if block:
+                yield block_to_block_type(block), block
+    if block_lines:
+        block = "\n".join(block_lines).strip()
+        if block:
+            yield block_to_block_type(block), block
+
+
+def markdown_to_html_node(markdown: str, cache=None):
+    """Convert markdown to full html node, reusing cached blocks if given a cache"""
     children = []
-    for block in markdown_to_blocks(markdown):
-        children.append(
-            block_type_to_helper_function(block_to_block_type(block))(block)
-        )
+    for block_type, block in scan_blocks(markdown):
+        children.append(block_to_html_node(block_type, block, cache))
 
     return ParentNode("div", children)
 
 
+def block_to_html_node(block_type: BlockType, block: str, cache=None):
+    """Convert a classified block to HTMLNode, through a BlockCache if given
+
+    Cached blocks come back as a LeafNode holding the rendered HTML
+    """
+    helper_function = block_type_to_helper_function(block_type)
+    if cache is None:
+        return helper_function(block)
+    return LeafNode(None, cache.render(block, lambda b: helper_function(b).to_html()))
+
+
 def block_type_to_helper_function(block_type: BlockType):
     """Convert block to to appropriate _to_html_node function"""
     match block_type:
@@ -224,16 +327,39 @@ def block_type_to_helper_function(block_type: BlockType):
             return ordered_list_to_html_node
 
 
+def block_inline_texts(block_type: BlockType, block: str):
+    """Inline markdown a block renders: one string per list item, none for code"""
+    match block_type:
+        case BlockType.PARAGRAPH:
+            return [block]
+        case BlockType.HEADING:
+            heading_level = len(block) - len(block.lstrip("#"))
+            return [block.replace(f"{'#'*heading_level} ", "")]
+        case BlockType.QUOTE:
+            return ["\n".join(l.lstrip(">").strip() for l in block.splitlines())]
+        case BlockType.UNORDERED_LIST:
+            return [line.lstrip("*-").lstrip() for line in block.splitlines()]
+        case BlockType.ORDERED_LIST:
+            return [line.lstrip("1234567890.").lstrip() for line in block.splitlines()]
+    return []
+
+
+def inline_to_html_nodes(text: str):
+    """Convert inline markdown to a list of HTMLNodes"""
+    return [tn.to_html_node() for tn in text_to_textnodes(text)]
+
+
 def paragraph_to_html_node(paragraph: str):
     """Convert paragraph string to HTMLNode"""
-    return ParentNode("p", [tn.to_html_node() for tn in text_to_textnodes(paragraph)])
+    (paragraph_text,) = block_inline_texts(BlockType.PARAGRAPH, paragraph)
+    return ParentNode("p", inline_to_html_nodes(paragraph_text))
 
 
 def heading_to_html_node(heading: str):
     """Convert heading string to HTMLNode"""
     heading_level = len(heading) - len(heading.lstrip("#"))
-    heading_text = heading.replace(f"{'#'*heading_level} ", "")
-    return ParentNode(f"h{heading_level}", [tn.to_html_node() for tn in text_to_textnodes(heading_text)])
+    (heading_text,) = block_inline_texts(BlockType.HEADING, heading)
+    return ParentNode(f"h{heading_level}", inline_to_html_nodes(heading_text))
 
 
 def code_to_html_node(code: str):
@@ -244,23 +370,21 @@ def code_to_html_node(code: str):
 
 def quote_to_html_node(quote: str):
     """Convert quote string to HTMLNode"""
-    quote_text = "\n".join(l.lstrip(">").strip() for l in quote.splitlines())
-    return ParentNode("blockquote", [tn.to_html_node() for tn in text_to_textnodes(quote_text)])
+    (quote_text,) = block_inline_texts(BlockType.QUOTE, quote)
+    return ParentNode("blockquote", inline_to_html_nodes(quote_text))
 
 
 def unordered_list_to_html_node(unordered: str):
     """Convert unordered list string to HTMLNode"""
     children = []
-    for line in unordered.splitlines():
-        line_text = line.lstrip("*-").lstrip()
-        children.append(ParentNode("li", [tn.to_html_node() for tn in text_to_textnodes(line_text)]))
+    for line_text in block_inline_texts(BlockType.UNORDERED_LIST, unordered):
+        children.append(ParentNode("li", inline_to_html_nodes(line_text)))
     return ParentNode("ul", children)
 
 
 def ordered_list_to_html_node(ordered: str):
     """Convert ordered list string to HTMLNode"""
     children = []
-    for line in ordered.splitlines():
-        line_text = line.lstrip("1234567890.").lstrip()
-        children.append(ParentNode("li", [tn.to_html_node() for tn in text_to_textnodes(line_text)]))
+    for line_text in block_inline_texts(BlockType.ORDERED_LIST, ordered):
+        children.append(ParentNode("li", inline_to_html_nodes(line_text)))
     return ParentNode("ol", children)
@@ -0,0 +1,152 @@
+"""Module providing SiteWatcher, which rebuilds only what changed on disk"""
+
+import os
+import shutil
+import time
+
+
+def snapshot(*roots: str):
+    """Map every file under roots (or a root that is itself a file) to (mtime, size)"""
+    files = {}
+    for root in roots:
+        if os.path.isfile(root):
+            stat = os.stat(root)
+            files[root] = (stat.st_mtime_ns, stat.st_size)
+            continue
+        pending = [root]
+        while pending:
+            with os.scandir(pending.pop()) as entries:
+                for entry in entries:
+                    if entry.is_dir():
+                        pending.append(entry.path)
+                    elif entry.is_file():
+                        stat = entry.stat()
+                        files[entry.path] = (stat.st_mtime_ns, stat.st_size)
+    return files
+
+
+def diff_snapshots(old: dict, new: dict):
+    """Return the sets of paths changed (or added) and removed between snapshots"""
+    changed = {path for path, key in new.items() if old.get(path) != key}
+    removed = set(old) - set(new)
+    return changed, removed
+
+
+class SiteWatcher:
+    """Polls content, static files and the template, and rebuilds affected outputs
+
+    render_page(source, dest) is called for each markdown page to (re)generate.
+    With a DependencyGraph only the pages depending on a changed file are
+    rebuilt; without one, a template change rebuilds every page
+    """
+
+    def __init__(
+        self,
+        content_dir: str,
+        static_dir: str,
+        template_path: str,
+        dest_dir: str,
+        render_page,
+        logging=True,
+        graph=None,
+    ):
+        self.content_dir = content_dir
+        self.static_dir = static_dir
+        self.template_path = template_path
+        self.dest_dir = dest_dir
+        self.render_page = render_page
+        self.logging = logging
+        self.graph = graph
+        self.files = snapshot(content_dir, static_dir, template_path)
+
+    def page_destination(self, source: str):
+        """Output path of a markdown page"""
+        relative = os.path.relpath(source, self.content_dir)
+        return os.path.join(self.dest_dir, f"{os.path.splitext(relative)[0]}.html")
+
+    def static_destination(self, source: str):
+        """Output path of a static file"""
+        return os.path.join(self.dest_dir, os.path.relpath(source, self.static_dir))
+
+    def is_page(self, path: str):
+        """Check whether path is a markdown page in the content directory"""
+        return path.startswith(self.content_dir + os.sep) and (
+            path.lower().endswith(".md")
+        )
+
+    def is_static(self, path: str):
+        """Check whether path is in the static directory"""
+        return path.startswith(self.static_dir + os.sep)
+
+    def poll(self):
+        """Check for changes once and rebuild; returns the outputs touched"""
+        files = snapshot(self.content_dir, self.static_dir, self.template_path)
+        changed, removed = diff_snapshots(self.files, files)
+        self.files = files
+        if not changed and not removed:
+            return []
+        start = time.perf_counter()
+        outputs = self.apply(changed, removed)
+        if self.logging:
+            elapsed = (time.perf_counter() - start) * 1000
+            print(f"Rebuilt {len(outputs)} file(s) in {elapsed:.0f} ms")
+        return outputs
+
+    def apply(self, changed: set, removed: set):
+        """Re-render, re-copy or delete the outputs of changed and removed files"""
+        if self.graph is not None:
+            for path in removed:
+                self.graph.forget(path)
+            affected = self.graph.affected(changed | removed)
+            changed = changed | {source for source, _ in affected}
+        elif self.template_path in changed:
+            changed = changed | {path for path in self.files if self.is_page(path)}
+        outputs = []
+        for path in sorted(changed):
+            if self.is_page(path):
+                dest = self.page_destination(path)
+                try:
+                    self.render_page(path, dest)
+                except (ValueError, OSError) as error:
+                    print(f"Error rendering {path}: {error}")
+                    continue
+            elif self.is_static(path):
+                dest = self.static_destination(path)
+                if self.logging:
+                    print(f"Copying: {path} to {dest}")
+                try:
+                    os.makedirs(os.path.dirname(dest), exist_ok=True)
+                    shutil.copy2(path, dest)
+                except OSError as error:
+                    print(f"Error copying {path}: {error}")
+                    continue
+            else:
+                continue
+            outputs.append(dest)
+        for path in sorted(removed):
+            if self.is_page(path):
+                dest = self.page_destination(path)
+            elif self.is_static(path):
+                dest = self.static_destination(path)
+            else:
+                continue
+            if os.path.exists(dest):
+                if self.logging:
+                    print(f"Removing: {dest}")
+                os.remove(dest)
+            outputs.append(dest)
+        return outputs
+
+    def run(self, interval=0.1):
+        """Poll forever, until interrupted"""
+        if self.logging:
+            print(
+                f"Watching {self.content_dir}, {self.static_dir} "
+                f"and {self.template_path}"
+            )
+        try:
+            while True:
+                self.poll()
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            pass